@@ -0,0 +1,67 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""Generate synthetic Zeppelin 0.7.1 notebooks for the benchmarks."""
+
+import base64
+import os
+
+# A 1x1 transparent PNG
+PNG = ('iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhf'
+       'DwAChwGA60e6kgAAAABJRU5ErkJggg==')
+
+
+def paragraph(index, text, msg, mode='scala'):
+    """Return a paragraph with a single result."""
+    return {
+        'id': 'paragraph_{0}'.format(index),
+        'title': 'Paragraph {0}'.format(index),
+        'text': text,
+        'user': 'benchmark',
+        'dateCreated': 'Feb 13, 2015 11:16:21 PM',
+        'dateUpdated': 'Dec 17, 2016 3:{0:02d}:15 PM'.format(index % 60),
+        'config': {'editorMode': 'ace/mode/' + mode},
+        'results': {'code': 'SUCCESS', 'msg': msg},
+    }
+
+
+def text_notebook(paragraphs):
+    """Return a notebook of many small code paragraphs with text results."""
+    return {'name': 'text', 'paragraphs': [
+        paragraph(i, '%spark\nval x{0} = {0}'.format(i),
+                  [{'type': 'TEXT', 'data': 'x{0}: Int = {0}\n'.format(i)}])
+        for i in range(paragraphs)]}
+
+
+def table_notebook(rows, columns=5):
+    """Return a notebook with a single table of rows rows."""
+    header = '\t'.join('column_{0}'.format(c) for c in range(columns))
+    body = '\n'.join('\t'.join(str(r * columns + c) for c in range(columns))
+                     for r in range(rows))
+    return {'name': 'table', 'paragraphs': [
+        paragraph(0, '%sql\nselect * from numbers',
+                  [{'type': 'TABLE', 'data': header + '\n' + body}], mode='sql')]}
+
+
+def image_notebook(images):
+    """Return a notebook with one embedded PNG per paragraph."""
+    html = '<div><img src="data:image/png;base64,{0}" /></div>'.format(PNG)
+    return {'name': 'images', 'paragraphs': [
+        paragraph(i, '%pyspark\nplot({0})'.format(i),
+                  [{'type': 'HTML', 'data': html}], mode='python')
+        for i in range(images)]}
+
+
+def large_image_notebook(megabytes):
+    """Return a notebook with a single embedded image of about megabytes MB."""
+    payload = base64.b64encode(os.urandom(int(megabytes * (1 << 20)))).decode('ascii')
+    html = '<div><img src="data:image/png;base64,{0}" /></div>'.format(payload)
+    return {'name': 'large image', 'paragraphs': [
+        paragraph(0, '%pyspark\nplot()', [{'type': 'HTML', 'data': html}], mode='python')]}
+
+
+def executor_notebook(paragraphs):
+    """Return a notebook to upload and run, without results."""
+    return {'name': 'execute', 'paragraphs': [
+        {'text': '%spark\nval x{0} = {0}'.format(i)} for i in range(paragraphs)]}
@@ -0,0 +1,172 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""Benchmark the converter and executor hot paths.
+
+Run `python benchmarks/run.py` from the main directory. Every case is timed
+over several runs, then run once more under tracemalloc to measure its peak
+memory and the memory blocks it left allocated. Results can be saved with
+`--save` and compared with a saved baseline with `--compare`.
+"""
+
+import argparse
+import contextlib
+import gc
+import glob
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from notebooks import (executor_notebook, image_notebook, large_image_notebook,  # noqa
+                       table_notebook, text_notebook)
+from zeppelin.cli.convert import get_version  # noqa
+from zeppelin.converters.markdown import LegacyConverter, NewConverter  # noqa
+from zeppelin.executors.async_executor import AsyncNotebookExecutor  # noqa
+from zeppelin.executors.notebook_executor import NotebookExecutor  # noqa
+from zeppelin.testing.server import MockZeppelin  # noqa
+
+# Options making the executor poll often enough for short paragraphs
+POLL_OPTIONS = {'poll_interval': 0.005, 'poll_max_interval': 0.05, 'poll_jitter': 0}
+
+
+def convert_case(notebook, directory):
+    """Return a function converting notebook to Markdown in memory."""
+    converter = LegacyConverter if get_version(notebook) == '0.6.2' else NewConverter
+
+    def run():
+        converter('in.json', 'out.md', directory).convert(notebook, io.StringIO())
+    return run
+
+
+def execute_case(server, notebooks, directory):
+    """Return a function executing every notebook against server."""
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()), \
+                contextlib.redirect_stderr(io.StringIO()):
+            if len(notebooks) == 1:
+                NotebookExecutor('note.json', os.path.join(directory, ''), server.url,
+                                 **POLL_OPTIONS).execute_notebook(notebooks[0])
+                return
+
+            paths = []
+            for index, notebook in enumerate(notebooks):
+                path = os.path.join(directory, 'note{0}.json'.format(index))
+                with open(path, 'w') as fh:
+                    json.dump(notebook, fh)
+                paths.append((path, os.path.join(directory, 'out', '')))
+            os.makedirs(os.path.join(directory, 'out'), exist_ok=True)
+            AsyncNotebookExecutor(server.url, max_jobs=8,
+                                  **POLL_OPTIONS).execute_notebooks(paths)
+    return run
+
+
+def cases(scale, directory, server):
+    """Yield (name, function) for every benchmark case."""
+    for path in sorted(glob.glob(os.path.join(ROOT, 'data', 'test*.json'))):
+        with open(path) as fh:
+            notebook = json.load(fh)
+        yield 'convert/' + os.path.basename(path), convert_case(notebook, directory)
+
+    yield ('convert/paragraphs-{0}'.format(int(10000 * scale)),
+           convert_case(text_notebook(int(10000 * scale)), directory))
+    yield ('convert/table-rows-{0}'.format(int(100000 * scale)),
+           convert_case(table_notebook(int(100000 * scale)), directory))
+    yield ('convert/images-{0}'.format(int(500 * scale)),
+           convert_case(image_notebook(int(500 * scale)), directory))
+    yield ('convert/image-{0}mb'.format(int(8 * scale)),
+           convert_case(large_image_notebook(8 * scale), directory))
+
+    yield 'execute/notebook', execute_case(server, [executor_notebook(20)], directory)
+    yield 'execute/batch', execute_case(server, [executor_notebook(5)] * 16, directory)
+
+
+def measure(run, repeat):
+    """Return the timings and memory usage of run."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    gc.collect()  # the converters hold reference cycles
+    retained = tracemalloc.take_snapshot().compare_to(before, 'filename')
+    tracemalloc.stop()
+
+    return {'min': min(times), 'median': statistics.median(times), 'peak': peak,
+            'blocks': sum(stat.count_diff for stat in retained)}
+
+
+def compare(results, baseline, threshold):
+    """Print the change of every case from baseline, returning the regressions."""
+    regressions = []
+    print('\n{0:32} {1:>10} {2:>10}'.format('change from baseline', 'median', 'peak'))
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        time_change = result['median'] / baseline[name]['median'] - 1
+        peak_change = result['peak'] / max(baseline[name]['peak'], 1) - 1
+        print('{0:32} {1:>+9.1%} {2:>+9.1%}'.format(name, time_change, peak_change))
+        if time_change > threshold or peak_change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the converter and executor.')
+    parser.add_argument('-k', dest='select', default='',
+                        help='only run the cases whose name contains this')
+    parser.add_argument('-n', dest='repeat', type=int, default=5,
+                        help='number of timed runs per case')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='scale the size of the synthetic notebooks')
+    parser.add_argument('--save', metavar='FILE', help='save the results as a baseline')
+    parser.add_argument('--compare', metavar='FILE', help='compare with a saved baseline')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='fail if a case is this much slower or larger than the baseline')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    results = {}
+    print('{0:32} {1:>10} {2:>10} {3:>10} {4:>10}'.format(
+          'case', 'min (s)', 'median (s)', 'peak (KB)', 'blocks'))
+    try:
+        with MockZeppelin(duration=0.002) as server:
+            for name, run in cases(args.scale, directory, server):
+                if args.select not in name:
+                    continue
+                result = results[name] = measure(run, args.repeat)
+                print('{0:32} {1:10.4f} {2:10.4f} {3:10.0f} {4:10d}'.format(
+                      name, result['min'], result['median'], result['peak'] / 1024,
+                      result['blocks']))
+    finally:
+        shutil.rmtree(directory)
+
+    if args.save:
+        with open(args.save, 'w') as fh:
+            json.dump(results, fh, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as fh:
+            regressions = compare(results, json.load(fh), args.threshold)
+        if regressions:
+            print('ERROR: Regressions in ' + ', '.join(regressions))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""Measure the import time of the zeppelin-convert and zeppelin-execute entry points.
+
+Run `python benchmarks/startup.py` from the main directory. Each entry point
+is imported in a fresh interpreter with `python -X importtime`, and the
+median cumulative import time is reported with the slowest imports. Pass
+`--max-ms` to exit with an error when an entry point is slower than that.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ENTRY_POINTS = ['zeppelin.cli.convert', 'zeppelin.cli.execute']
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(module):
+    """Import module in a fresh interpreter, returning {module: (self us, cumulative us)}."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                            cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            universal_newlines=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+
+def measure(module, runs):
+    """Return the median cumulative import time in ms and the slowest imports of the last run."""
+    totals = []
+    for _ in range(runs):
+        times = import_times(module)
+        totals.append(times[module][1] / 1000)
+    slowest = sorted(times.items(), key=lambda item: item[1][0], reverse=True)
+    return statistics.median(totals), slowest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the startup time of the CLIs.')
+    parser.add_argument('-n', dest='runs', type=int, default=5,
+                        help='number of runs per entry point')
+    parser.add_argument('--top', type=int, default=10,
+                        help='number of slowest imports to list')
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help='fail if an entry point takes longer to import')
+    args = parser.parse_args()
+
+    failed = False
+    for module in ENTRY_POINTS:
+        median, slowest = measure(module, args.runs)
+        print('{0}: {1:.1f} ms'.format(module, median))
+        for name, (own, cumulative) in slowest[:args.top]:
+            print('    {0:8.1f} ms  {1}'.format(own / 1000, name.strip()))
+        if args.max_ms is not None and median > args.max_ms:
+            print('ERROR: {0} took {1:.1f} ms, more than {2} ms'.format(
+                  module, median, args.max_ms))
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
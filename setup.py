@@ -14,7 +14,8 @@ setup(
     entry_points={
     	'console_scripts': [
     		'zeppelin-convert = zeppelin.cli.convert:main',
-    		'zeppelin-execute = zeppelin.cli.execute:main'
+    		'zeppelin-execute = zeppelin.cli.execute:main',
+    		'zeppelin-export = zeppelin.cli.export:main'
     	],
     },
     packages=find_packages(),
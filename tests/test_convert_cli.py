@@ -0,0 +1,114 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import json
+import os
+import pytest
+from zeppelin.cli.convert import convert_batch, main
+from zeppelin.cli.utils import find_notebooks, is_batch_input, output_directory
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def test_is_batch_input():
+    assert is_batch_input(DATA_DIR)
+    assert is_batch_input('data/*.json')
+    assert not is_batch_input(os.path.join(DATA_DIR, 'test.json'))
+
+
+def test_find_notebooks(tmpdir):
+    tmpdir.mkdir('a').join('note.json').write('{}')
+    tmpdir.mkdir('b').join('note.json').write('{}')
+    tmpdir.join('readme.md').write('')
+
+    root, notebooks = find_notebooks(str(tmpdir))
+    assert root == str(tmpdir)
+    assert notebooks == [str(tmpdir.join('a', 'note.json')),
+                         str(tmpdir.join('b', 'note.json'))]
+
+    root, notebooks = find_notebooks(str(tmpdir.join('*', 'note.json')))
+    assert root == str(tmpdir)
+    assert len(notebooks) == 2
+
+
+def test_output_directory():
+    assert output_directory('in', 'in/a/note.json', 'out') == os.path.join('out', 'a')
+    assert output_directory('in', 'in/note.json', 'out') == 'out'
+
+
+def test_convert_batch(tmpdir, capsys):
+    tmpdir.join('broken.json').write('{')
+    for name in ('test.json', 'test2.json'):
+        with open(os.path.join(DATA_DIR, name)) as fh:
+            tmpdir.mkdir(name[:-5]).join('note.json').write(fh.read())
+
+    out = tmpdir.mkdir('out')
+    failed = convert_batch(str(tmpdir.join('**', '*.json')), str(out), workers=2)
+
+    assert failed == 1
+    assert out.join('test', 'note.md').check()
+    assert out.join('test2', 'note.md').check()
+    captured = capsys.readouterr()
+    assert 'Converted 2/3 notebooks' in captured.out
+    assert 'broken.json' in captured.err
+
+
+def test_convert_batch_shared_directory(tmpdir, capsys):
+    out = tmpdir.mkdir('out')
+    failed = convert_batch(os.path.join(DATA_DIR, 'test[23].json'), str(out), workers=1)
+
+    assert failed == 0
+    assert out.join('test2', 'test2.md').check()
+    assert out.join('test3', 'test3.md').check()
+    assert out.join('test3', 'images', 'output_1.png').check()
+
+
+@pytest.mark.parametrize('image_workers', [0, 2])
+def test_convert_batch_image_errors(tmpdir, capsys, image_workers):
+    notebook = {'name': 'a', 'paragraphs': [
+        {'id': 'p1', 'text': '%python x', 'config': {'editorMode': 'ace/mode/python'},
+         'results': {'code': 'SUCCESS', 'msg': [
+             {'type': 'HTML', 'data': '<img src="data:image/png;base64,not base64!">'}]}}]}
+    tmpdir.mkdir('in').join('a.json').write(json.dumps(notebook))
+
+    failed = convert_batch(str(tmpdir.join('in')), str(tmpdir.join('out')), workers=1,
+                           options={'image_workers': image_workers})
+
+    assert failed == 1
+    captured = capsys.readouterr()
+    assert 'Converted 0/1 notebooks' in captured.out
+    assert 'a.json' in captured.err
+
+
+def test_batch_stats_keep_stdout_parseable(tmpdir, monkeypatch, capsys):
+    monkeypatch.setattr('sys.argv', ['zeppelin-convert', '-o', str(tmpdir), '-j', '1', '--stats',
+                                     '-i', os.path.join(DATA_DIR, 'test[24].json')])
+    with pytest.raises(SystemExit) as exit:
+        main()
+
+    assert exit.value.code == 0
+    captured = capsys.readouterr()
+    assert 'Converted 2/2 notebooks' in captured.out
+    assert '"phases"' not in captured.out
+    assert sorted(json.loads(captured.err)) == ['counters', 'paragraphs', 'phases']
+
+
+@pytest.mark.parametrize('content, message', [
+    ('{', 'ERROR: Invalid JSON format'),
+    (json.dumps({'name': 'a', 'paragraphs': [
+        {'id': 'p1', 'text': '%python x', 'config': {'editorMode': 'ace/mode/python'},
+         'results': {'code': 'SUCCESS', 'msg': [
+             {'type': 'HTML', 'data': '<img src="data:image/png;base64,abcde">'}]}}]}),
+     'ERROR: Conversion failed: Error: '),
+])
+def test_convert_errors(tmpdir, monkeypatch, capsys, content, message):
+    tmpdir.join('a.json').write(content)
+    monkeypatch.setattr('sys.argv', ['zeppelin-convert', '-i', str(tmpdir.join('a.json')),
+                                     '-o', str(tmpdir.join('a.md'))])
+    with pytest.raises(SystemExit) as exit:
+        main()
+
+    assert exit.value.code == 1
+    assert capsys.readouterr().out.startswith(message)
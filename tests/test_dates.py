@@ -0,0 +1,29 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import pytest
+from zeppelin.converters.dates import parse_date
+from dateutil.parser import parse
+
+
+@pytest.mark.parametrize('text', [
+                         'Dec 17, 2016 3:32:15 PM',
+                         'Feb 28, 2017 11:44:54 AM',
+                         'Jan 1, 2017 12:00:00 AM',
+                         'Jan 1, 2017 12:30:00 PM',
+                         'Feb 29, 2016 1:00:00 AM',
+                         '2015-07-03T01:43:40+0000',
+                         'Sept 9, 2016 1:10:00 PM'])
+def test_parse_date(text):
+    assert parse_date(text) == parse(text)
+    assert parse_date(text).tzinfo == parse(text).tzinfo
+
+
+@pytest.mark.parametrize('text', ['Feb 30, 2017 1:00:00 AM',
+                                  'Sep 9, 2016 13:10:00 PM',
+                                  'not a date'])
+def test_parse_date_invalid(text):
+    with pytest.raises(ValueError):
+        parse_date(text)
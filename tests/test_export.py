@@ -0,0 +1,41 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import os
+import json
+from zeppelin.cli.convert import convert_file
+from zeppelin.cli.export import export_notebooks
+from zeppelin.testing.server import MockZeppelin
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def test_export_notebooks(tmpdir, capsys):
+    with MockZeppelin() as zeppelin:
+        ids = {}
+        for name in ('test.json', 'test2.json', 'test4.json'):
+            with open(os.path.join(DATA_DIR, name)) as fh:
+                ids[name] = zeppelin.add_notebook(json.load(fh))
+        empty = zeppelin.add_notebook({'name': 'empty', 'paragraphs': []})
+        broken = zeppelin.add_notebook({'name': 'broken', 'paragraphs': [{'text': 1}]})
+
+        failed = export_notebooks(zeppelin.url, str(tmpdir), workers=2)
+
+    assert failed == 1
+    assert zeppelin.requests['get_notebook'] == 5
+    assert zeppelin.connections <= 2
+    captured = capsys.readouterr()
+    assert 'Exported 4/5 notebooks' in captured.out
+    assert 'ERROR: {0}'.format(broken) in captured.err
+
+    # A new notebook without paragraphs is exported with just the header
+    exported = tmpdir.join(empty, 'note.md').read()
+    assert exported.startswith('---\ntitle: empty\n')
+    assert exported.endswith('---')
+
+    for name, notebook_id in ids.items():
+        exported = tmpdir.join(notebook_id, 'note.md').read()
+        convert_file(os.path.join(DATA_DIR, name), 'note', str(tmpdir.join(notebook_id)))
+        assert exported == tmpdir.join(notebook_id, 'note.md').read()
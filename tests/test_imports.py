@@ -0,0 +1,19 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import subprocess
+import sys
+import pytest
+
+
+@pytest.mark.parametrize('module, lazy', [
+                         ('zeppelin.cli.convert', ['cairosvg', 'dateutil', 'multiprocessing',
+                                                   'concurrent.futures']),
+                         ('zeppelin.cli.execute', ['asyncio'])])
+def test_entry_points_defer_heavy_imports(module, lazy):
+    code = 'import sys, {0}; print(" ".join(sys.modules))'.format(module)
+    loaded = subprocess.check_output([sys.executable, '-c', code],
+                                     universal_newlines=True).split()
+    assert [name for name in lazy if name in loaded] == []
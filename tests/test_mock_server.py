@@ -0,0 +1,119 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import json
+import pytest
+from zeppelin.cli.execute import main as execute_main
+from zeppelin.executors.async_executor import AsyncNotebookExecutor
+from zeppelin.executors.notebook_executor import NotebookExecutor
+from zeppelin.stats import Stats
+from zeppelin.testing.server import MockZeppelin, zeppelin_date
+from datetime import datetime
+
+POLL = {'poll_interval': 0.01, 'poll_max_interval': 0.05, 'poll_jitter': 0}
+
+
+def notebook(*texts):
+    return {'name': 'note', 'paragraphs': [{'title': None, 'text': text} for text in texts]}
+
+
+@pytest.fixture
+def zeppelin():
+    with MockZeppelin(duration=0.02) as zeppelin:
+        yield zeppelin
+
+
+def test_zeppelin_date():
+    assert zeppelin_date(datetime(2016, 12, 17, 15, 32, 15)) == 'Dec 17, 2016 3:32:15 PM'
+    assert zeppelin_date(datetime(2016, 12, 7, 0, 2, 5)) == 'Dec 7, 2016 12:02:05 AM'
+
+
+def test_execute_notebook(zeppelin, tmpdir, capsys):
+    stats = Stats()
+    executor = NotebookExecutor('note.json', str(tmpdir) + '/', zeppelin.url, stats=stats,
+                                **POLL)
+    executor.execute_notebook(notebook('1', '2'))
+
+    body = json.loads(tmpdir.join('note.json').read())
+    assert [p['status'] for p in body['paragraphs']] == ['FINISHED', 'FINISHED']
+    assert [p['results']['msg'][0]['data'] for p in body['paragraphs']] == ['1', '2']
+    assert [p['seconds'] is not None for p in stats.paragraphs] == [True, True]
+    assert zeppelin.requests['create_notebook'] == 1
+    assert zeppelin.requests['run_notebook'] == 1
+
+
+def test_busy_responses(tmpdir, capsys):
+    with MockZeppelin(busy_responses=2) as zeppelin:
+        stats = Stats()
+        NotebookExecutor('note.json', str(tmpdir) + '/', zeppelin.url, stats=stats,
+                         **POLL).execute_notebook(notebook('1'))
+    assert stats.counters['busy_responses'] == 2
+    assert 'still busy' in capsys.readouterr().out
+
+
+def test_failed_paragraph(tmpdir, capsys):
+    with MockZeppelin(fail=lambda paragraph: paragraph['text'] == 'fail') as zeppelin:
+        executor = NotebookExecutor('note.json', str(tmpdir) + '/', zeppelin.url,
+                                    fail_fast=True, **POLL)
+        with pytest.raises(SystemExit):
+            executor.execute_notebook(notebook('fail', '2'))
+        statuses = [p['status'] for p in zeppelin.state.notebooks['NOTE1']['paragraphs']]
+    assert statuses[0] == 'ERROR'
+    assert zeppelin.requests['stop_notebook'] == 1
+
+
+def test_reuse_and_select(zeppelin, tmpdir):
+    options = dict(POLL, reuse='name', cleanup=False)
+    NotebookExecutor('note.json', str(tmpdir) + '/', zeppelin.url,
+                     **options).execute_notebook(notebook('1', '2'))
+    NotebookExecutor('note.json', str(tmpdir) + '/', zeppelin.url, paragraphs=['1'],
+                     **options).execute_notebook(notebook('1', '3'))
+
+    assert zeppelin.requests['create_notebook'] == 1
+    assert zeppelin.requests['update_paragraph'] == 1
+    assert zeppelin.requests['run_paragraph'] == 1
+    body = json.loads(tmpdir.join('note.json').read())
+    assert body['paragraphs'][1]['results']['msg'][0]['data'] == '3'
+
+
+def test_select_ignores_old_errors(tmpdir, capsys):
+    options = dict(POLL, reuse='name', cleanup=False)
+    with MockZeppelin(fail=lambda paragraph: paragraph['text'] == 'fail') as zeppelin:
+        with pytest.raises(SystemExit):
+            NotebookExecutor('note.json', str(tmpdir) + '/', zeppelin.url,
+                             **options).execute_notebook(notebook('fail', '2'))
+        NotebookExecutor('note.json', str(tmpdir) + '/', zeppelin.url, paragraphs=['1'],
+                         **options).execute_notebook(notebook('fail', '2'))
+
+    body = json.loads(tmpdir.join('note.json').read())
+    assert [p['status'] for p in body['paragraphs']] == ['ERROR', 'FINISHED']
+
+
+def test_async_connection_reuse(zeppelin, tmpdir, capsys):
+    paths = []
+    for index in range(6):
+        path = tmpdir.join('note{0}.json'.format(index))
+        path.write(json.dumps(notebook(str(index))))
+        paths.append((str(path), str(tmpdir.mkdir('out{0}'.format(index))) + '/'))
+
+    results = AsyncNotebookExecutor(zeppelin.url, max_jobs=3, pool_size=3,
+                                    **POLL).execute_notebooks(paths)
+    assert [errors for path, errors, elapsed in results] == [[]] * 6
+    assert zeppelin.connections <= 3
+
+
+def test_stream_results_file(zeppelin, tmpdir, monkeypatch):
+    tmpdir.join('note.json').write(json.dumps(notebook('1', '2')))
+    results = tmpdir.join('results.jsonl')
+    results.write('{"previous": "run"}\n')
+    monkeypatch.setattr('sys.argv', [
+        'zeppelin-execute', '-i', str(tmpdir.join('note.json')), '-o', str(tmpdir.mkdir('out')),
+        '-u', zeppelin.url, '--stream-results', str(results),
+        '--poll-interval', '0.01', '--poll-max-interval', '0.05'])
+    execute_main()
+
+    lines = [json.loads(line) for line in results.read().splitlines()]
+    assert lines[0] == {'previous': 'run'}
+    assert [line['status'] for line in lines[1:]] == ['FINISHED', 'FINISHED']
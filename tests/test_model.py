@@ -0,0 +1,76 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import io
+import pytest
+from zeppelin.converters.reader import NotebookReader
+from zeppelin.model import Notebook, Paragraph
+
+
+def test_new_paragraph():
+    paragraph = Paragraph({'id': 'p1', 'title': 'Title', 'text': '%spark 1',
+                           'user': 'me', 'dateCreated': 'Jun 1, 2017 1:00:00 PM',
+                           'status': 'FINISHED', 'config': {'editorMode': 'ace/mode/scala'},
+                           'results': {'code': 'SUCCESS',
+                                       'msg': [{'type': 'TEXT', 'data': 'a'},
+                                               {'type': 'HTML', 'data': '<b>'}]}})
+    assert paragraph.id == 'p1'
+    assert paragraph.title == 'Title'
+    assert paragraph.text == '%spark 1'
+    assert paragraph.user == 'me'
+    assert paragraph.date_created == 'Jun 1, 2017 1:00:00 PM'
+    assert paragraph.date_updated is None
+    assert paragraph.status == 'FINISHED'
+    assert paragraph.editor_mode == 'ace/mode/scala'
+    assert paragraph.version == '0.7.1'
+    assert paragraph.code == 'SUCCESS'
+    assert paragraph.outputs == [('TEXT', 'a'), ('HTML', '<b>')]
+    assert paragraph.error is None
+
+
+def test_legacy_paragraph():
+    paragraph = Paragraph({'id': 'p1', 'config': {},
+                           'result': {'code': 'ERROR', 'type': 'TEXT', 'msg': 'boom'}})
+    assert paragraph.version == '0.6.2'
+    assert paragraph.editor_mode is None
+    assert paragraph.outputs == [('TEXT', 'boom')]
+    assert paragraph.error == 'boom'
+
+
+@pytest.mark.parametrize('raw', [
+    {},
+    {'result': {'code': 'SUCCESS', 'msg': ''}},
+    {'results': {'code': 'SUCCESS', 'msg': []}},
+    {'results': None},
+])
+def test_paragraph_without_outputs(raw):
+    paragraph = Paragraph(raw)
+    assert paragraph.outputs == []
+    assert paragraph.error is None
+
+
+def test_paragraph_slots():
+    with pytest.raises(AttributeError):
+        Paragraph({}).extra = 1
+
+
+def test_notebook():
+    raw = {'name': 'n', 'paragraphs': [{'id': 'p1', 'results': {}}, {'id': 'p2'}]}
+    notebook = Notebook(raw)
+    assert notebook.name == 'n'
+    assert notebook.version == '0.7.1'
+    assert [paragraph.id for paragraph in notebook.paragraphs] == ['p1', 'p2']
+
+    assert Notebook({'paragraphs': [{'id': 'p1'}]}).version == '0.6.2'
+    assert Notebook({'paragraphs': []}).version == '0.7.1'
+
+
+def test_notebook_reader():
+    reader = NotebookReader(io.StringIO('{"paragraphs": [{"id": 1}, {"id": 2}], "name": "n"}'))
+    notebook = Notebook(reader)
+    assert [paragraph.id for paragraph in notebook.paragraphs] == [1, 2]
+    # Every pass re-reads the paragraphs
+    assert [paragraph.id for paragraph in notebook.paragraphs] == [1, 2]
+    assert notebook.name == 'n'
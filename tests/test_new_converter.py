@@ -3,8 +3,14 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 
+import base64
+import hashlib
+import io
+import os
 import pytest
-from zeppelin.converters.markdown import NewConverter
+from zeppelin.converters.markdown import (NewConverter, TABLE_CHUNK_ROWS, BASE64_CHUNK,
+                                          find_base64, md_row, payload_digest, write_base64)
+from zeppelin.stats import Stats
 from dateutil.parser import parse
 
 
@@ -145,3 +151,179 @@ def test_process_results(zc):
     }
     zc.process_results(paragraph)
     assert zc.out == ['one ring to bring them all']
+
+
+def test_process_results_all_outputs(zc, capsys):
+    paragraph = {
+        'config': {
+            'editorMode': 'ace/mode/python'
+        },
+        'results': {
+            'msg': [{'type': 'TEXT', 'data': 'first'},
+                    {'type': 'ANGULAR', 'data': '<div>{{value}}</div>'},
+                    {'type': 'UNKNOWN', 'data': 'dropped'},
+                    {'type': 'UNKNOWN', 'data': 'dropped'},
+                    {'type': 'TABLE', 'data': 'a\tb\n1\t2'}]
+        }
+    }
+    zc.process_results(paragraph)
+    assert zc.out == ['first', '|a|b|\n|-|-|', '|1|2|']
+    assert capsys.readouterr().err.count('unsupported output type UNKNOWN') == 1
+
+
+def test_write_stream(zc):
+    fout = io.StringIO()
+    zc.fout = fout
+    zc.build_header('title')
+    zc.build_code('scala', 'sample body')
+    assert zc.out == []
+    assert fout.getvalue() == '\n'.join(['---',
+                                         'title: title',
+                                         'author(s): anonymous',
+                                         'tags: ',
+                                         'created_at: N/A',
+                                         'updated_at: N/A',
+                                         'tldr: ',
+                                         'thumbnail: ',
+                                         '---',
+                                         '```scala',
+                                         'sample body',
+                                         '```'])
+
+
+def test_image_workers(tmpdir):
+    png = 'data:image/png;base64,iVBORw0KGgo="'
+    zc = NewConverter('in', 'out', str(tmpdir), image_workers=2)
+    for _ in range(5):
+        zc.build_image(png)
+    zc.wait_for_images()
+
+    assert zc.image_errors == []
+    assert len(zc.out) == 5
+    for index in range(1, 6):
+        assert tmpdir.join('images', 'output_{}.png'.format(index)).check()
+
+
+def test_image_workers_errors(tmpdir, capsys):
+    zc = NewConverter('in', 'out', str(tmpdir), image_workers=2)
+    zc.build_image('data:image/png;base64,not base64!"')
+    zc.build_image('data:image/png;base64,iVBORw0KGgo="')
+    zc.wait_for_images()
+
+    assert [path for path, err in zc.image_errors] == [
+        '{0}/output_1.png'.format(tmpdir.join('images'))]
+    assert 'ERROR: Could not write image' in capsys.readouterr().err
+
+
+class CountingConverter(NewConverter):
+    writes = 0
+
+    def write_image_to_disk(self, msg, result, fh):
+        CountingConverter.writes += 1
+        super().write_image_to_disk(msg, result, fh)
+
+
+def test_hash_images(tmpdir):
+    CountingConverter.writes = 0
+    png = 'data:image/png;base64,iVBORw0KGgo="'
+    name = hashlib.sha1(b'iVBORw0KGgo=').hexdigest()
+    zc = CountingConverter('in', 'out', str(tmpdir), hash_images=True)
+    zc.build_image(png)
+    zc.build_image(png)
+
+    assert CountingConverter.writes == 1
+    assert zc.out == ['\n![png]({0}/{1}.png)\n'.format(tmpdir.join('images'), name)] * 2
+    assert tmpdir.join('images').listdir() == [tmpdir.join('images', name + '.png')]
+
+
+def test_image_cache(tmpdir):
+    CountingConverter.writes = 0
+    png = 'data:image/png;base64,iVBORw0KGgo="'
+    name = hashlib.sha1(b'iVBORw0KGgo=').hexdigest()
+    cache = str(tmpdir.join('cache'))
+    for run in ('first', 'second'):
+        zc = CountingConverter('in', 'out', str(tmpdir.join(run)), image_cache=cache)
+        zc.build_image(png)
+        assert tmpdir.join(run, 'images', name + '.png').read_binary() == b'\x89PNG\r\n\x1a\n'
+
+    assert CountingConverter.writes == 1
+    assert tmpdir.join('cache').listdir() == [tmpdir.join('cache', name + '.png')]
+
+
+def test_build_table(zc):
+    zc.build_table('a\tb\n1\t2\n\nnote\n3\t4\n')
+    assert zc.out == ['|a|b|\n|-|-|', '|1|2|\nnote\n|3|4|']
+
+
+def test_build_table_body(zc):
+    rows = ['{0}\t{0}'.format(i) for i in range(TABLE_CHUNK_ROWS + 1)]
+    zc.build_table('h1\th2\n' + '\n'.join(rows) + '\n')
+    assert len(zc.out) == 2
+    assert zc.out[1].split('\n') == ['|{0}|{0}|'.format(i) for i in range(len(rows))]
+
+
+def test_build_table_chunks(zc):
+    rows = ['{0}\t{0}'.format(i) for i in range(TABLE_CHUNK_ROWS)] + ['note']
+    zc.build_table('h1\th2\n' + '\n'.join(rows))
+    assert len(zc.out) == 3
+    assert '\n'.join(zc.out).split('\n')[2:] == [md_row(row) for row in rows]
+
+
+def test_build_table_max_rows():
+    zc = NewConverter('in', 'out', '', max_table_rows=2)
+    zc.build_table('a\tb\n1\t2\n3\t4\n5\t6\n7\t8\n')
+    assert zc.out == ['|a|b|\n|-|-|', '|1|2|\n|3|4|', '\n_2 more rows truncated_']
+
+
+def test_build_img(tmpdir):
+    zc = NewConverter('in', 'out', str(tmpdir))
+    zc.render_output('IMG', 'iVBORw0KGgo=\n')
+    assert zc.out == ['\n![png]({0}/output_1.png)\n'.format(tmpdir.join('images'))]
+    assert tmpdir.join('images', 'output_1.png').read_binary() == b'\x89PNG\r\n\x1a\n'
+
+
+def test_build_network(zc):
+    zc.build_network('{"nodes": [{"id": 1, "label": "User"}, {"id": 2, "label": "Movie"}],'
+                     ' "edges": [{"source": 1, "target": 2, "label": "LIKES"}]}')
+    assert zc.out == ['|id|label|\n|-|-|', '|1|User|\n|2|Movie|',
+                      '|source|target|label|\n|-|-|-|', '|1|2|LIKES|']
+
+
+def test_output_handlers():
+    zc = NewConverter('in', 'out', '', output_handlers={
+        'ANGULAR': lambda converter, msg: converter.write('<!-- {0} -->'.format(msg))})
+    zc.render_output('ANGULAR', 'angular')
+    assert zc.out == ['<!-- angular -->']
+
+
+def test_stats():
+    stats = Stats()
+    zc = NewConverter('in', 'out', '', stats=stats)
+    zc.convert({'name': 'note', 'paragraphs': [
+        {'id': 'p1', 'text': '%md\nhello', 'dateCreated': 'Feb 28, 2017 3:44:54 PM',
+         'config': {'editorMode': 'ace/mode/markdown'}},
+        {'id': 'p2', 'text': '%sql\nselect 1', 'config': {'editorMode': 'ace/mode/sql'},
+         'results': {'msg': [{'type': 'TABLE', 'data': 'a\n1'}]}}]}, io.StringIO())
+
+    assert sorted(stats.phases) == ['dates', 'input', 'output', 'tables']
+    assert [(p['id'], p['chars']) for p in stats.paragraphs] == [('p1', 5), ('p2', 19)]
+
+
+def test_find_base64():
+    match = find_base64('<img src="data:image/png;base64,iVBORw0KGgo=" />')
+    assert (match.start(1), match.end(1)) == (32, 44)
+    assert match.group(1) == 'iVBORw0KGgo='
+    assert find_base64('data:image/png;base64,iVBORw0KGgo=') is None
+
+
+def test_write_base64():
+    data = os.urandom(BASE64_CHUNK)
+    encoded = base64.b64encode(data).decode('ascii')
+    # Line breaks and stray characters shift the chunk boundaries
+    msg = 'base64,' + encoded[:1001] + '\n' + encoded[1001:5000] + '!' + encoded[5000:] + '"'
+    fh = io.BytesIO()
+    write_base64(msg, fh, 7, len(msg) - 1)
+    assert fh.getvalue() == data
+
+    assert payload_digest(msg, 7, len(msg) - 1) == \
+        hashlib.sha1(msg[7:-1].encode('utf-8')).hexdigest()
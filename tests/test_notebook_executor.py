@@ -0,0 +1,326 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import pytest
+from zeppelin.executors.async_executor import AsyncNotebookExecutor
+from zeppelin.executors.notebook_executor import (NotebookExecutor, content_hash, create_session,
+                                                  poll_intervals)
+from zeppelin.stats import Stats
+
+
+class FakeResponse():
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+class FakeSession():
+    """Replay canned responses for (method, path) and record every request."""
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        path = url.split('/', 3)[3]
+        self.calls.append((method, path, kwargs))
+        responses = self.routes[(method, path)]
+        if callable(responses):
+            status_code, body = responses(**kwargs)
+        else:
+            status_code, body = responses.pop(0) if len(responses) > 1 else responses[0]
+        return FakeResponse(status_code, body)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+
+@pytest.fixture
+def session():
+    return FakeSession({
+        ('POST', 'api/notebook'): [(200, {'body': 'NOTE1'})],
+        ('POST', 'api/notebook/job/NOTE1'): [(200, {})],
+        ('GET', 'api/notebook/job/NOTE1'): [
+            (200, {'body': [{'id': 'p1', 'status': 'FINISHED'}]})],
+        ('GET', 'api/notebook/NOTE1'): [
+            (200, {'body': {'paragraphs': [{'id': 'p1', 'results': {'code': 'SUCCESS'}}]}})],
+    })
+
+
+def test_create_session():
+    adapter = create_session(pool_size=4, max_retries=2).get_adapter('http://localhost:8890')
+    assert adapter._pool_connections == 4
+    assert adapter._pool_maxsize == 4
+    assert adapter.max_retries.total == 2
+    assert 500 not in adapter.max_retries.status_forcelist
+
+
+def test_execute_notebook(session, tmpdir):
+    executor = NotebookExecutor('note.json', str(tmpdir) + '/', 'zeppelin:8890',
+                                session=session, timeout=7)
+    executor.execute_notebook({'paragraphs': []})
+
+    assert [(method, path) for method, path, kwargs in session.calls] == [
+        ('POST', 'api/notebook'),
+        ('POST', 'api/notebook/job/NOTE1'),
+        ('GET', 'api/notebook/job/NOTE1'),
+        ('GET', 'api/notebook/NOTE1')]
+    assert all(kwargs['timeout'] == 7 for method, path, kwargs in session.calls)
+    assert tmpdir.join('note.json').check()
+
+
+def test_finish(tmpdir):
+    executor = NotebookExecutor('note.json', str(tmpdir) + '/', 'zeppelin:8890',
+                                session=FakeSession({}))
+    failed = {'paragraphs': [{'id': 'p1', 'results': {'code': 'ERROR',
+                                                      'msg': [{'data': 'boom'}]}}]}
+    assert executor.finish({'paragraphs': []}, failed) == ['boom']
+    assert not tmpdir.join('note.json').check()
+
+    succeeded = {'paragraphs': [{'id': 'p1', 'results': {'code': 'SUCCESS'}}]}
+    assert executor.finish({'paragraphs': []}, succeeded) == []
+    assert tmpdir.join('note.json').check()
+
+
+def test_poll_intervals():
+    intervals = poll_intervals(0.5, 3, 2, 0)
+    assert [next(intervals) for _ in range(5)] == [0.5, 1, 2, 3, 3]
+
+    intervals = poll_intervals(1, 1, 2, 0.1)
+    assert all(0.9 <= next(intervals) <= 1.1 for _ in range(100))
+
+
+def test_wait_for_notebook_backoff(monkeypatch, capsys):
+    sleeps = []
+    monkeypatch.setattr('time.sleep', sleeps.append)
+    session = FakeSession({('GET', 'api/notebook/job/NOTE1'): [
+        (500, {}),
+        (200, {'body': [{'id': 'p1', 'status': 'RUNNING'}]}),
+        (200, {'body': [{'id': 'p1', 'status': 'RUNNING'}]}),
+        (200, {'body': [{'id': 'p1', 'status': 'FINISHED'}]})]})
+    executor = NotebookExecutor('note.json', '', 'zeppelin:8890', session=session,
+                                poll_interval=0.25, poll_jitter=0)
+    executor.notebook_id = 'NOTE1'
+    executor.wait_for_notebook_to_execute()
+
+    assert sleeps == [0.25, 0.5, 1]
+    assert 'Checking again in 0.2 seconds' in capsys.readouterr().out
+
+
+def test_execute_notebook_stats(session, monkeypatch, capsys):
+    monkeypatch.setattr('time.sleep', lambda delay: None)
+    session.routes[('GET', 'api/notebook/job/NOTE1')].insert(0, (500, {}))
+    session.routes[('GET', 'api/notebook/NOTE1')] = [(200, {'body': {'paragraphs': [
+        {'id': 'p1', 'status': 'FINISHED', 'results': {'code': 'SUCCESS'},
+         'dateStarted': 'Feb 28, 2017 3:44:54 PM', 'dateFinished': 'Feb 28, 2017 3:45:04 PM'}]}})]
+    stats = Stats()
+    NotebookExecutor('note.json', '', 'zeppelin:8890', session=session, poll_jitter=0,
+                     stats=stats).execute_notebook({'paragraphs': [{'text': '1'}]})
+
+    assert sorted(stats.phases) == ['busy_wait', 'cleanup', 'fetch', 'prepare', 'save',
+                                    'start', 'wait']
+    assert stats.counters == {'status_checks': 2, 'busy_responses': 1}
+    assert stats.paragraphs == [{'notebook': 'note.json', 'index': 0, 'id': 'p1',
+                                 'status': 'FINISHED', 'seconds': 10.0, 'result_chars': 19}]
+
+
+def test_wait_for_notebook_deadline(monkeypatch):
+    clock = [100.0]
+    sleeps = []
+
+    def sleep(delay):
+        sleeps.append(delay)
+        clock[0] += delay
+
+    monkeypatch.setattr('time.sleep', sleep)
+    monkeypatch.setattr('time.monotonic', lambda: clock[0])
+    session = FakeSession({('GET', 'api/notebook/job/NOTE1'): [
+        (200, {'body': [{'id': 'p1', 'status': 'RUNNING'}]})]})
+    executor = NotebookExecutor('note.json', '', 'zeppelin:8890', session=session,
+                                poll_interval=2, poll_backoff=2, poll_jitter=0, deadline=5)
+    executor.notebook_id = 'NOTE1'
+    with pytest.raises(SystemExit):
+        executor.wait_for_notebook_to_execute()
+
+    # The last delay is cut short to check the notebook once more at the deadline
+    assert sleeps == [2, 3]
+    assert len(session.calls) == 3
+
+
+def test_wait_for_notebook_finishes_at_deadline(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr('time.sleep', lambda delay: clock.__setitem__(0, clock[0] + delay))
+    monkeypatch.setattr('time.monotonic', lambda: clock[0])
+    session = FakeSession({('GET', 'api/notebook/job/NOTE1'): [
+        (200, {'body': [{'id': 'p1', 'status': 'RUNNING'}]}),
+        (200, {'body': [{'id': 'p1', 'status': 'FINISHED'}]})]})
+    executor = NotebookExecutor('note.json', '', 'zeppelin:8890', session=session,
+                                poll_interval=30, poll_jitter=0, deadline=10)
+    executor.notebook_id = 'NOTE1'
+    executor.wait_for_notebook_to_execute()
+    assert clock[0] == 110.0
+
+
+def test_async_execute_notebooks(monkeypatch, tmpdir, capsys):
+    monkeypatch.setattr('time.sleep', lambda delay: None)
+    routes = {('POST', 'api/notebook'): lambda json, timeout: (200, {'body': json['name']})}
+    for i in range(3):
+        code = 'ERROR' if i == 1 else 'SUCCESS'
+        routes[('POST', 'api/notebook/job/NOTE{}'.format(i))] = [(200, {})]
+        routes[('GET', 'api/notebook/job/NOTE{}'.format(i))] = [
+            (200, {'body': [{'id': 'p1', 'status': 'RUNNING'}]}),
+            (200, {'body': [{'id': 'p1', 'status': 'FINISHED'}]})]
+        routes[('GET', 'api/notebook/NOTE{}'.format(i))] = [(200, {'body': {'paragraphs': [
+            {'id': 'p1', 'results': {'code': code, 'msg': [{'data': 'boom'}]}}]}})]
+    session = FakeSession(routes)
+
+    notebooks = []
+    for i in range(3):
+        tmpdir.mkdir('in{}'.format(i)).join('note.json').write(
+            '{{"name": "NOTE{}", "paragraphs": []}}'.format(i))
+        output = tmpdir.mkdir('out{}'.format(i))
+        notebooks.append((str(tmpdir.join('in{}'.format(i), 'note.json')), str(output) + '/'))
+
+    executor = AsyncNotebookExecutor('zeppelin:8890', max_jobs=2, session=session,
+                                     poll_interval=0.01)
+    results = executor.execute_notebooks(notebooks)
+
+    assert [(path, errors) for path, errors, elapsed in results] == [
+        (notebooks[0][0], []), (notebooks[1][0], ['boom']), (notebooks[2][0], [])]
+    assert tmpdir.join('out0', 'note.json').check()
+    assert not tmpdir.join('out1', 'note.json').check()
+    assert 'Executed 2/3 notebooks successfully' in capsys.readouterr().err
+
+
+def test_stream_paragraphs(monkeypatch):
+    monkeypatch.setattr('time.sleep', lambda delay: None)
+    session = FakeSession({
+        ('GET', 'api/notebook/job/NOTE1'): [
+            (200, {'body': [{'id': 'p1', 'status': status1}, {'id': 'p2', 'status': status2}]})
+            for status1, status2 in [('RUNNING', 'READY'),
+                                     ('FINISHED', 'RUNNING'),
+                                     ('FINISHED', 'FINISHED')]],
+        ('GET', 'api/notebook/NOTE1/paragraph/p1'): [(200, {'body': {'id': 'p1', 'text': 'a'}})],
+        ('GET', 'api/notebook/NOTE1/paragraph/p2'): [(200, {'body': {'id': 'p2', 'text': 'b'}})]})
+    streamed = []
+    executor = NotebookExecutor('note.json', '', 'zeppelin:8890', session=session,
+                                on_paragraph=streamed.append)
+    executor.notebook_id = 'NOTE1'
+    executor.wait_for_notebook_to_execute()
+
+    assert streamed == [{'id': 'p1', 'text': 'a'}, {'id': 'p2', 'text': 'b'}]
+
+
+def test_fail_fast(monkeypatch):
+    monkeypatch.setattr('time.sleep', lambda delay: None)
+    session = FakeSession({
+        ('GET', 'api/notebook/job/NOTE1'): [
+            (200, {'body': [{'id': 'p1', 'status': 'ERROR'}, {'id': 'p2', 'status': 'RUNNING'}]})],
+        ('DELETE', 'api/notebook/job/NOTE1'): [(200, {})]})
+    executor = NotebookExecutor('note.json', '', 'zeppelin:8890', session=session,
+                                fail_fast=True)
+    executor.notebook_id = 'NOTE1'
+    executor.wait_for_notebook_to_execute()
+
+    assert executor.aborted
+    assert [(method, path) for method, path, kwargs in session.calls] == [
+        ('GET', 'api/notebook/job/NOTE1'), ('DELETE', 'api/notebook/job/NOTE1')]
+
+
+def test_reuse_by_name(session):
+    session.routes[('GET', 'api/notebook')] = [
+        (200, {'body': [{'id': 'OTHER', 'name': 'other'}, {'id': 'NOTE1', 'name': 'note'}]})]
+    session.routes[('GET', 'api/notebook/NOTE1')] = [(200, {'body': {'paragraphs': [
+        {'id': 'p1', 'text': 'a'}, {'id': 'p2', 'text': 'b'}, {'id': 'p3', 'text': 'c'}]}})]
+    session.routes[('PUT', 'api/notebook/NOTE1/paragraph/p2')] = [(200, {})]
+    session.routes[('DELETE', 'api/notebook/NOTE1/paragraph/p3')] = [(200, {})]
+    executor = NotebookExecutor('note.json', '', 'zeppelin:8890', session=session, reuse='name')
+    executor.prepare_notebook({'name': 'note', 'paragraphs': [{'text': 'a'}, {'text': 'B'}]})
+
+    assert executor.notebook_id == 'NOTE1'
+    assert not executor.created
+    assert [(method, path, kwargs.get('json')) for method, path, kwargs in session.calls] == [
+        ('GET', 'api/notebook', None),
+        ('GET', 'api/notebook/NOTE1', None),
+        ('PUT', 'api/notebook/NOTE1/paragraph/p2', {'title': None, 'text': 'B'}),
+        ('DELETE', 'api/notebook/NOTE1/paragraph/p3', None)]
+
+
+def test_reuse_by_hash(session):
+    data = {'name': 'note', 'paragraphs': [{'text': 'a'}]}
+    name = 'note [{0}]'.format(content_hash(data))
+    session.routes[('GET', 'api/notebook')] = [(200, {'body': []})]
+    session.routes[('POST', 'api/notebook')] = lambda json, timeout: (200, {'body': json['name']})
+
+    executor = NotebookExecutor('note.json', '', 'zeppelin:8890', session=session, reuse='hash')
+    executor.prepare_notebook(data)
+    assert executor.notebook_id == name
+    assert executor.created
+
+    session.routes[('GET', 'api/notebook')] = [(200, {'body': [{'id': 'NOTE1', 'name': name}]})]
+    session.calls = []
+    executor = NotebookExecutor('note.json', '', 'zeppelin:8890', session=session, reuse='hash')
+    executor.prepare_notebook(data)
+    assert executor.notebook_id == 'NOTE1'
+    assert [path for method, path, kwargs in session.calls] == ['api/notebook']
+
+
+def test_cleanup(session, capsys):
+    session.routes[('DELETE', 'api/notebook/NOTE1')] = [(200, {})]
+    executor = NotebookExecutor('note.json', '', 'zeppelin:8890', session=session, cleanup=True)
+    executor.execute_notebook({'paragraphs': []})
+
+    assert session.calls[-1][:2] == ('DELETE', 'api/notebook/NOTE1')
+    assert '"paragraphs"' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('specs, downstream, expected', [
+                         (['1'], False, [1]),
+                         (['p3', '0'], False, [0, 3]),
+                         (['1:3'], False, [1, 2]),
+                         ([':2', '4:'], False, [0, 1, 4]),
+                         (['p2'], True, [2, 3, 4]),
+                         ([], True, [])])
+def test_select_paragraphs(specs, downstream, expected):
+    executor = NotebookExecutor('note.json', '', 'zeppelin:8890', session=FakeSession({}),
+                                paragraphs=specs, downstream=downstream)
+    paragraphs = [{'id': 'p{}'.format(i), 'text': str(i)} for i in range(5)]
+    assert executor.select_paragraphs(paragraphs) == expected
+
+
+def test_run_changed_paragraphs(tmpdir, capsys):
+    state_file = str(tmpdir.join('state.json'))
+    data = {'paragraphs': [{'id': 'a', 'text': '1'}, {'id': 'b', 'text': '2'}]}
+    finished = [{'id': 'S1', 'status': 'FINISHED'}, {'id': 'S2', 'status': 'FINISHED'}]
+    session = FakeSession({
+        ('POST', 'api/notebook'): [(200, {'body': 'NOTE1'})],
+        ('POST', 'api/notebook/job/NOTE1/S1'): [(200, {})],
+        ('POST', 'api/notebook/job/NOTE1/S2'): [(200, {})],
+        ('GET', 'api/notebook/job/NOTE1'): [(200, {'body': finished})],
+        ('GET', 'api/notebook/NOTE1'): [(200, {'body': {'paragraphs': finished}})]})
+
+    def run():
+        session.calls = []
+        NotebookExecutor('note.json', '', 'zeppelin:8890', session=session,
+                         state_file=state_file).execute_notebook(data)
+        return [path for method, path, kwargs in session.calls if method == 'POST'][1:]
+
+    assert run() == ['api/notebook/job/NOTE1/S1', 'api/notebook/job/NOTE1/S2']
+    assert run() == []
+    assert 'No paragraphs to run.' in capsys.readouterr().err
+    data['paragraphs'][1]['text'] = '3'
+    assert run() == ['api/notebook/job/NOTE1/S2']
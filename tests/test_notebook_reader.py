@@ -0,0 +1,84 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import io
+import json
+import os
+import pytest
+from zeppelin.cli.convert import get_version
+from zeppelin.converters.markdown import NewConverter, LegacyConverter
+from zeppelin.converters.reader import NotebookReader
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+NOTEBOOKS = ['test.json', 'test2.json', 'test3.json', 'test4.json', 'test5.json', 'test6.json']
+
+
+def load(name):
+    with open(os.path.join(DATA_DIR, name), 'rb') as fh:
+        return json.load(fh)
+
+
+@pytest.mark.parametrize('name', NOTEBOOKS)
+def test_paragraphs(name):
+    expected = load(name)
+    with open(os.path.join(DATA_DIR, name), 'rb') as fh:
+        reader = NotebookReader(fh, chunk_size=97)
+        assert list(reader['paragraphs']) == expected['paragraphs']
+        assert reader['name'] == expected['name']
+        assert reader.metadata == {k: v for k, v in expected.items() if k != 'paragraphs'}
+
+        # A second pass re-reads the file from the start
+        assert list(reader['paragraphs']) == expected['paragraphs']
+
+
+def test_metadata_before_paragraphs():
+    reader = NotebookReader(io.StringIO('{"name": "n", "paragraphs": [{"id": 1}, {"id": 2}]}'))
+    assert reader['name'] == 'n'
+    assert 'id' not in reader
+    assert [p['id'] for p in reader['paragraphs']] == [1, 2]
+
+
+@pytest.mark.parametrize('text', [
+                         '{"paragraphs": [], "version": 12345}',
+                         '{"paragraphs": []}',
+                         '{}'])
+def test_small_chunks(text):
+    reader = NotebookReader(io.StringIO(text), chunk_size=1)
+    assert list(reader['paragraphs']) == []
+    assert reader.metadata == {k: v for k, v in json.loads(text).items() if k != 'paragraphs'}
+
+
+@pytest.mark.parametrize('text', [
+                         '{"paragraphs": [{"id": 1}',
+                         '{"paragraphs": [{"id": 1}}',
+                         '["paragraphs"]',
+                         ''])
+def test_invalid_json(text):
+    reader = NotebookReader(io.StringIO(text), chunk_size=4)
+    with pytest.raises(ValueError):
+        list(reader['paragraphs'])
+
+
+@pytest.mark.parametrize('name', NOTEBOOKS)
+def test_convert_stream_matches(name, tmpdir):
+    expected = load(name)
+    converter = NewConverter if get_version(expected) == '0.7.1' else LegacyConverter
+    full = io.StringIO()
+    converter('in', 'out', str(tmpdir)).convert(expected, full)
+
+    with open(os.path.join(DATA_DIR, name), 'rb') as fh:
+        reader = NotebookReader(fh, chunk_size=1024)
+        assert get_version(reader) == get_version(expected)
+        streamed = io.StringIO()
+        converter('in', 'out', str(tmpdir)).convert(reader, streamed)
+        assert streamed.getvalue() == full.getvalue()
+
+        streamed = io.StringIO()
+        converter('in', 'out', str(tmpdir)).convert(reader, streamed, stream=True)
+        assert streamed.getvalue() == full.getvalue()
+
+    streamed = io.StringIO()
+    converter('in', 'out', str(tmpdir)).convert(expected, streamed, stream=True)
+    assert streamed.getvalue() == full.getvalue()
@@ -0,0 +1,80 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import io
+import json
+import os
+from zeppelin.converters.cache import ParagraphCache
+from zeppelin.converters.markdown import NewConverter
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+class CountingConverter(NewConverter):
+    rendered = 0
+
+    def process_input(self, paragraph):
+        CountingConverter.rendered += 1
+        super().process_input(paragraph)
+
+
+def convert(notebook, tmpdir, **options):
+    CountingConverter.rendered = 0
+    fout = io.StringIO()
+    CountingConverter('in', 'out', str(tmpdir.join('out')), **options).convert(notebook, fout)
+    return fout.getvalue()
+
+
+def test_reuse_unchanged_paragraphs(tmpdir):
+    with open(os.path.join(DATA_DIR, 'test2.json')) as fh:
+        notebook = json.load(fh)
+    cache = str(tmpdir.join('cache'))
+    expected = convert(notebook, tmpdir, hash_images=True)
+    total = CountingConverter.rendered
+
+    assert convert(notebook, tmpdir, paragraph_cache=cache) == expected
+    assert CountingConverter.rendered == total
+
+    assert convert(notebook, tmpdir, paragraph_cache=cache) == expected
+    assert CountingConverter.rendered == 0
+
+    notebook['paragraphs'][1]['text'] += '\nprint(1)'
+    assert convert(notebook, tmpdir, paragraph_cache=cache) != expected
+    assert CountingConverter.rendered == 1
+
+
+def test_settings_invalidate(tmpdir):
+    notebook = {'name': 'n', 'paragraphs': [
+        {'id': 'p1', 'text': '%sql select 1', 'config': {'editorMode': 'ace/mode/sql'},
+         'results': {'code': 'SUCCESS', 'msg': [{'type': 'TABLE', 'data': 'a\n1\n2\n3'}]}}]}
+    cache = str(tmpdir.join('cache'))
+    full = convert(notebook, tmpdir, paragraph_cache=cache)
+    capped = convert(notebook, tmpdir, paragraph_cache=cache, max_table_rows=1)
+    assert CountingConverter.rendered == 1
+    assert capped != full
+    assert '_2 more rows truncated_' in capped
+    assert convert(notebook, tmpdir, paragraph_cache=cache, max_table_rows=1) == capped
+    assert CountingConverter.rendered == 0
+
+    def handler(converter, msg):
+        converter.write('custom')
+
+    assert 'custom' in convert(notebook, tmpdir, paragraph_cache=cache,
+                               output_handlers={'TABLE': handler})
+    assert CountingConverter.rendered == 1
+
+
+def test_missing_image_invalidates(tmpdir):
+    cache = ParagraphCache(str(tmpdir), 'key')
+    image = tmpdir.join('image.png')
+    image.write('')
+    cache.put('p1', 'digest', ['line'], [str(image)])
+    cache.save()
+
+    cache = ParagraphCache(str(tmpdir), 'key')
+    assert cache.get('p1', 'digest') == ['line']
+    assert cache.get('p1', 'other') is None
+    image.remove()
+    assert cache.get('p1', 'digest') is None
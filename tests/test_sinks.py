@@ -0,0 +1,128 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import io
+import json
+import os
+from zeppelin.cli.convert import convert_file
+from zeppelin.converters.markdown import NewConverter
+from zeppelin.converters.sinks import HTMLSink, Sink, SummarySink
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+NOTEBOOK = {'name': 'Note', 'paragraphs': [
+    {'id': 'p1', 'title': 'Intro', 'text': '%md # <Hello>', 'user': 'me',
+     'dateCreated': 'Jun 1, 2017 1:00:00 PM', 'config': {'editorMode': 'ace/mode/markdown'},
+     'results': {'code': 'SUCCESS', 'msg': [{'type': 'HTML', 'data': '<h1>Hello</h1>'}]}},
+    {'id': 'p2', 'text': '%sql select 1', 'config': {'editorMode': 'ace/mode/sql'},
+     'results': {'code': 'SUCCESS',
+                 'msg': [{'type': 'TABLE', 'data': 'a\tb\n1\t2\n3\t4\n'},
+                         {'type': 'IMG', 'data': 'iVBORw0KGgo='}]}},
+    {'id': 'p3', 'text': '%python 1/0', 'config': {'editorMode': 'ace/mode/python'},
+     'results': {'code': 'ERROR', 'msg': [{'type': 'TEXT', 'data': 'ZeroDivisionError'}]}}]}
+
+
+class RecordingSink(Sink):
+    def __init__(self):
+        self.events = []
+
+    def __getattribute__(self, name):
+        attr = object.__getattribute__(self, name)
+        if name == 'events' or not callable(attr):
+            return attr
+        return lambda *args: self.events.append((name,) + args)
+
+
+def convert(tmpdir, sinks, **options):
+    converter = NewConverter('in', 'out', str(tmpdir), sinks=sinks, **options)
+    fout = io.StringIO()
+    converter.convert(NOTEBOOK, fout)
+    return fout.getvalue()
+
+
+def test_markdown_unchanged(tmpdir):
+    expected = convert(tmpdir, None)
+    assert convert(tmpdir, [RecordingSink(), RecordingSink()]) == expected
+
+
+def test_events(tmpdir):
+    sink = RecordingSink()
+    convert(tmpdir, [sink], max_table_rows=1)
+    names = [event[0] for event in sink.events]
+    assert names == ['start', 'begin_paragraph', 'add_title', 'add_input', 'end_paragraph',
+                     'begin_paragraph', 'add_input', 'add_table', 'add_image', 'end_paragraph',
+                     'begin_paragraph', 'add_input', 'add_text', 'end_paragraph', 'finish']
+    assert sink.events[0] == ('start', 'Note')
+    assert sink.events[3] == ('add_input', 'md', '# <Hello>')
+    assert sink.events[7] == ('add_table', [['a', 'b'], ['1', '2']], 1)
+    assert sink.events[8] == ('add_image', 'images/output_1.png')
+    assert sink.events[-1][1] == 'me'
+
+
+def test_html_sink(tmpdir):
+    fh = io.StringIO()
+    convert(tmpdir, [HTMLSink(fh)])
+    page = fh.getvalue()
+    assert page.startswith('<!DOCTYPE html>\n')
+    assert '<title>Note</title>' in page
+    assert '<section class="paragraph" id="p1">' in page
+    assert '<h4>Intro</h4>' in page
+    assert '<pre class="markdown"># &lt;Hello&gt;</pre>' in page
+    assert '<pre><code class="language-sql">select 1</code></pre>' in page
+    assert '<tr><th>a</th><th>b</th></tr>' in page
+    assert '<tr><td>3</td><td>4</td></tr>' in page
+    assert '<img src="images/output_1.png" alt="png">' in page
+    assert '<pre class="output">ZeroDivisionError</pre>' in page
+    assert '<p>Author(s): me</p>' in page
+    assert page.endswith('</html>\n')
+
+
+def test_summary_sink(tmpdir):
+    fh = io.StringIO()
+    convert(tmpdir, [SummarySink(fh)])
+    summary = json.loads(fh.getvalue())
+    assert summary == {
+        'title': 'Note',
+        'author': 'me',
+        'created_at': '2017-06-01 13:00:00',
+        'updated_at': 'N/A',
+        'languages': ['md', 'python', 'sql'],
+        'paragraphs': [{'id': 'p1', 'title': 'Intro', 'language': 'md'},
+                       {'id': 'p2', 'title': None, 'language': 'sql'},
+                       {'id': 'p3', 'title': None, 'language': 'python'}],
+        'errors': [{'id': 'p3', 'title': None, 'message': 'ZeroDivisionError'}]}
+
+
+def test_convert_formats(tmpdir):
+    in_filename = os.path.join(DATA_DIR, 'test.json')
+    convert_file(in_filename, 'plain', str(tmpdir))
+    for stream in (False, True):
+        directory = tmpdir.mkdir('stream' if stream else 'loaded')
+        full_path = convert_file(in_filename, 'note', str(directory), stream,
+                                 {'formats': ['html', 'summary']})
+        assert full_path == str(directory.join('note.md'))
+        assert directory.join('note.md').read() == tmpdir.join('plain.md').read()
+        assert directory.join('note.html').read().count('<section') == 6
+        summary = json.loads(directory.join('note.summary.json').read())
+        assert summary['languages'] == ['md', 'scala', 'sql']
+
+
+def test_paragraph_cache(tmpdir):
+    cache = str(tmpdir.join('cache'))
+    convert(tmpdir, None, paragraph_cache=cache)
+    sink = RecordingSink()
+    convert(tmpdir, [sink], paragraph_cache=cache)
+    assert [event[0] for event in sink.events].count('begin_paragraph') == 3
+
+
+def test_html_image_links(tmpdir):
+    directory = tmpdir.join('out', 'x')
+    directory.ensure(dir=True)
+    convert_file(os.path.join(DATA_DIR, 'test3.json'), 'note', str(directory),
+                 options={'formats': ['html']})
+    page = directory.join('note.html').read()
+    links = [line.split('"')[1] for line in page.splitlines() if line.startswith('<img ')]
+    assert links == ['images/output_1.png', 'images/output_2.png']
+    assert all(directory.join(link).check() for link in links)
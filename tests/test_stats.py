@@ -0,0 +1,68 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import io
+import json
+import pytest
+from zeppelin.stats import Stats, NULL_TIMER, instrument, load_hook, timer
+
+
+def test_stats():
+    events = []
+    stats = Stats([events.append])
+    with stats.timer('parse'):
+        pass
+    stats.add_time('parse', 1.0)
+    stats.count('polls')
+    stats.count('polls', 2)
+    stats.add_paragraph(id='p1', seconds=0.5)
+
+    data = stats.to_dict()
+    assert data['phases']['parse']['count'] == 2
+    assert data['phases']['parse']['seconds'] >= 1.0
+    assert data['counters'] == {'polls': 3}
+    assert data['paragraphs'] == [{'id': 'p1', 'seconds': 0.5}]
+    assert [event['type'] for event in events] == ['phase', 'phase', 'count', 'count',
+                                                   'paragraph']
+
+    merged = Stats()
+    merged.merge(data)
+    merged.merge(data)
+    assert merged.to_dict()['counters'] == {'polls': 6}
+    assert merged.to_dict()['phases']['parse']['count'] == 4
+
+    fh = io.StringIO()
+    stats.write(fh)
+    assert json.loads(fh.getvalue()) == data
+
+
+def test_timer():
+    assert timer(None, 'parse') is NULL_TIMER
+    stats = Stats()
+    with timer(stats, 'parse'):
+        pass
+    assert stats.phases['parse']['count'] == 1
+
+
+def test_instrument():
+    class Converter():
+        def double(self, value):
+            return value * 2
+
+    stats = Stats()
+    converter = Converter()
+    instrument(converter, stats, {'double': 'math'})
+    assert converter.double(2) == 4
+    assert stats.phases['math']['count'] == 1
+    assert Converter().double.__func__ is Converter.double
+
+
+def test_load_hook(capsys):
+    assert load_hook('json:dumps') is json.dumps
+    with pytest.raises(SystemExit):
+        load_hook('json:missing')
+    captured = capsys.readouterr()
+    assert captured.out == ''
+    assert 'Could not load stats hook json:missing' in captured.err
@@ -0,0 +1,69 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import os
+import pytest
+from zeppelin.cli.watch import Watcher
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def save(path, name, mtime):
+    with open(os.path.join(DATA_DIR, name)) as fh:
+        path.write(fh.read(), ensure=True)
+    os.utime(str(path), (mtime, mtime))
+
+
+@pytest.fixture
+def notebooks(tmpdir):
+    save(tmpdir.join('in', 'a', 'note.json'), 'test.json', 1000)
+    save(tmpdir.join('in', 'b', 'note.json'), 'test2.json', 1000)
+    return tmpdir
+
+
+def converted(results):
+    return sorted(os.path.basename(os.path.dirname(path)) for path, output, error in results)
+
+
+def test_watch_debounce(notebooks):
+    watcher = Watcher(str(notebooks.join('in')), str(notebooks.join('out')), debounce=0.5)
+    assert watcher.poll(now=0) == []
+    assert converted(watcher.poll(now=0.5)) == ['a', 'b']
+    before = notebooks.join('out', 'a', 'note.md').read()
+    assert watcher.poll(now=1) == []
+
+    save(notebooks.join('in', 'a', 'note.json'), 'test3.json', 2000)
+    assert watcher.poll(now=2) == []
+    save(notebooks.join('in', 'a', 'note.json'), 'test2.json', 2001)
+    assert watcher.poll(now=2.4) == []
+    assert watcher.poll(now=2.8) == []
+    assert converted(watcher.poll(now=2.9)) == ['a']
+    assert notebooks.join('out', 'a', 'note.md').read() != before
+
+
+def test_watch_skips_up_to_date(notebooks):
+    watcher = Watcher(str(notebooks.join('in')), str(notebooks.join('out')), debounce=0)
+    assert converted(watcher.poll(now=0)) == ['a', 'b']
+
+    watcher = Watcher(str(notebooks.join('in')), str(notebooks.join('out')), debounce=0)
+    assert watcher.poll(now=0) == []
+
+
+def test_watch_hash(notebooks):
+    watcher = Watcher(str(notebooks.join('in')), str(notebooks.join('out')), debounce=0,
+                      use_hash=True)
+    assert converted(watcher.poll(now=0)) == ['a', 'b']
+
+    os.utime(str(notebooks.join('in', 'a', 'note.json')), (3000, 3000))
+    assert watcher.poll(now=1) == []
+    save(notebooks.join('in', 'b', 'note.json'), 'test3.json', 3000)
+    assert converted(watcher.poll(now=2)) == ['b']
+
+
+def test_watch_errors(notebooks):
+    notebooks.join('in', 'c', 'note.json').write('{', ensure=True)
+    watcher = Watcher(str(notebooks.join('in')), str(notebooks.join('out')), debounce=0)
+    errors = [error for path, output, error in watcher.poll(now=0) if error]
+    assert len(errors) == 1 and errors[0].startswith('JSONDecodeError')
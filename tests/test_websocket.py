@@ -0,0 +1,176 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import json
+import socket
+import threading
+import pytest
+from zeppelin.executors.async_executor import AsyncNotebookExecutor
+from zeppelin.executors.notebook_executor import NotebookExecutor
+from zeppelin.executors.websocket import (WebSocket, accept_key, encode_frame, read_frame,
+                                          OP_PING, OP_TEXT)
+from test_notebook_executor import FakeSession
+
+
+class StandInServer():
+    """Accept one WebSocket connection and answer it like Zeppelin would."""
+
+    def __init__(self, paragraphs, events, handshake=True):
+        self.paragraphs = paragraphs
+        self.events = events
+        self.handshake = handshake
+        self.received = []
+        self.listener = socket.socket()
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(1)
+        self.url = 'ws://127.0.0.1:{0}/ws'.format(self.listener.getsockname()[1])
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        conn, _ = self.listener.accept()
+        rfile = conn.makefile('rb')
+        headers = {}
+        for line in iter(rfile.readline, b'\r\n'):
+            name, _, value = line.decode('latin-1').strip().partition(': ')
+            headers[name.lower()] = value
+
+        if not self.handshake:
+            conn.sendall(b'HTTP/1.1 404 Not Found\r\n\r\n')
+            conn.close()
+            return
+
+        conn.sendall('HTTP/1.1 101 Switching Protocols\r\n'
+                     'Upgrade: websocket\r\nConnection: Upgrade\r\n'
+                     'Sec-WebSocket-Accept: {0}\r\n\r\n'.format(
+                         accept_key(headers['sec-websocket-key'])).encode('latin-1'))
+
+        fin, opcode, payload = read_frame(rfile.read)
+        self.received.append(json.loads(payload.decode('utf-8')))
+        self.send(conn, {'op': 'NOTE', 'data': {'note': {'paragraphs': self.paragraphs}}})
+        conn.sendall(encode_frame(OP_PING, b'', mask=False))
+        for event in self.events:
+            self.send(conn, event)
+        conn.close()
+
+    def send(self, conn, message):
+        conn.sendall(encode_frame(OP_TEXT, json.dumps(message).encode('utf-8'), mask=False))
+
+
+def paragraph_event(paragraph_id, status):
+    return {'op': 'PARAGRAPH', 'data': {'paragraph': {'id': paragraph_id, 'status': status}}}
+
+
+@pytest.fixture
+def session():
+    return FakeSession({('GET', 'api/notebook/job/NOTE1'): [
+        (200, {'body': [{'id': 'p1', 'status': 'FINISHED'},
+                        {'id': 'p2', 'status': 'FINISHED'}]})]})
+
+
+def test_websocket_roundtrip():
+    server = StandInServer([], [{'op': 'PROGRESS', 'data': {'x': 'y' * 70000}}])
+    ws = WebSocket(server.url, timeout=5)
+    ws.send('{"op": "GET_NOTE"}')
+    assert json.loads(ws.recv())['op'] == 'NOTE'
+    assert json.loads(ws.recv())['data']['x'] == 'y' * 70000
+    ws.close()
+    assert server.received == [{'op': 'GET_NOTE'}]
+
+
+def test_wait_for_notebook_events(session, monkeypatch):
+    monkeypatch.setattr('time.sleep', pytest.fail)
+    server = StandInServer([{'id': 'p1'}, {'id': 'p2'}],
+                           [paragraph_event('p1', 'RUNNING'),
+                            paragraph_event('p1', 'FINISHED'),
+                            paragraph_event('p2', 'RUNNING'),
+                            paragraph_event('p2', 'ERROR')])
+    executor = NotebookExecutor('note.json', '', 'zeppelin:8890', session=session,
+                                wait_mode='websocket', websocket_url=server.url,
+                                poll_interval=5)
+    executor.notebook_id = 'NOTE1'
+    executor.subscribe_to_notebook()
+    assert executor.paragraph_ids == ['p1', 'p2']
+    assert server.received[0]['op'] == 'GET_NOTE'
+    assert server.received[0]['data'] == {'id': 'NOTE1'}
+
+    executor.wait_for_notebook_to_execute()
+    assert [path for method, path, kwargs in session.calls] == ['api/notebook/job/NOTE1']
+    assert executor.websocket is None
+
+
+def test_websocket_fallback(session, monkeypatch, capsys):
+    monkeypatch.setattr('time.sleep', lambda delay: None)
+    server = StandInServer([], [], handshake=False)
+    executor = NotebookExecutor('note.json', '', 'zeppelin:8890', session=session,
+                                wait_mode='websocket', websocket_url=server.url)
+    executor.notebook_id = 'NOTE1'
+    executor.subscribe_to_notebook()
+    assert executor.websocket is None
+    assert 'polling instead' in capsys.readouterr().err
+
+    executor.wait_for_notebook_to_execute()
+    assert [path for method, path, kwargs in session.calls] == ['api/notebook/job/NOTE1']
+
+
+def test_websocket_closed_while_waiting(session, monkeypatch, capsys):
+    monkeypatch.setattr('time.sleep', lambda delay: None)
+    server = StandInServer([{'id': 'p1'}, {'id': 'p2'}], [paragraph_event('p1', 'FINISHED')])
+    executor = NotebookExecutor('note.json', '', 'zeppelin:8890', session=session,
+                                wait_mode='websocket', websocket_url=server.url)
+    executor.notebook_id = 'NOTE1'
+    executor.subscribe_to_notebook()
+    executor.wait_for_notebook_to_execute()
+
+    assert 'WebSocket failed' in capsys.readouterr().err
+    assert [path for method, path, kwargs in session.calls] == ['api/notebook/job/NOTE1']
+
+
+def test_websocket_fallback_keeps_deadline(session, monkeypatch, capsys):
+    monkeypatch.setattr('time.sleep', lambda delay: None)
+    server = StandInServer([{'id': 'p1'}, {'id': 'p2'}], [paragraph_event('p1', 'FINISHED')])
+    executor = NotebookExecutor('note.json', '', 'zeppelin:8890', session=session,
+                                wait_mode='websocket', websocket_url=server.url, deadline=60)
+    executor.notebook_id = 'NOTE1'
+    deadlines = []
+    start_polling = executor.start_polling
+
+    def record_polling():
+        intervals, deadline = start_polling()
+        deadlines.append(deadline)
+        return intervals, deadline
+
+    executor.start_polling = record_polling
+    executor.subscribe_to_notebook()
+    executor.wait_for_notebook_to_execute()
+
+    assert 'WebSocket failed' in capsys.readouterr().err
+    assert len(deadlines) == 1
+
+
+def test_async_websocket(session, monkeypatch, tmpdir, capsys):
+    monkeypatch.setattr('time.sleep', pytest.fail)
+    server = StandInServer([{'id': 'p1'}, {'id': 'p2'}],
+                           [paragraph_event('p1', 'FINISHED'),
+                            paragraph_event('p2', 'FINISHED')])
+    session.routes.update({
+        ('POST', 'api/notebook'): [(200, {'body': 'NOTE1'})],
+        ('POST', 'api/notebook/job/NOTE1'): [(200, {})],
+        ('GET', 'api/notebook/NOTE1'): [(200, {'body': {'paragraphs': []}})]})
+    tmpdir.join('note.json').write('{"name": "n", "paragraphs": []}')
+
+    paragraphs = []
+    executor = AsyncNotebookExecutor('zeppelin:8890', session=session, wait_mode='websocket',
+                                     websocket_url=server.url, poll_interval=5,
+                                     on_paragraph=paragraphs.append)
+    results = executor.execute_notebooks([(str(tmpdir.join('note.json')),
+                                           str(tmpdir.mkdir('out')) + '/')])
+
+    assert [errors for path, errors, elapsed in results] == [[]]
+    assert server.received[0]['op'] == 'GET_NOTE'
+    # Finished paragraphs come from the WebSocket events, not from polling
+    assert paragraphs == [{'id': 'p1', 'status': 'FINISHED'}, {'id': 'p2', 'status': 'FINISHED'}]
+    assert [(method, path) for method, path, kwargs in session.calls].count(
+        ('GET', 'api/notebook/job/NOTE1')) == 1
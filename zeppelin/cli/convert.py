@@ -7,16 +7,150 @@ import os
 import argparse
 import json
 import sys
+import time
+from collections import Counter
+from contextlib import ExitStack
+from functools import partial
+from .utils import find_notebooks, is_batch_input, output_directory, write_stats
 from ..converters.markdown import NewConverter
 from ..converters.markdown import LegacyConverter
+from ..converters.reader import NotebookReader
+from ..converters.sinks import HTMLSink, SummarySink
+from ..model import Notebook
+from ..stats import Stats, load_hook, timer
+
+# Extra output formats, written next to the Markdown file
+FORMATS = {'html': ('.html', HTMLSink),
+           'summary': ('.summary.json', SummarySink)}
 
 
 def get_version(text):
     """Return correct version of Zeppelin file based on JSON format."""
-    if 'results' in text['paragraphs'][0]:
-        return '0.7.1'
-    else:
-        return '0.6.2'
+    return Notebook(text).version
+
+
+def convert_file(in_filename, out_filename, directory='', stream=False, options=None):
+    """Convert a single Zeppelin notebook into a Markdown file.
+
+    If stream is True, paragraphs are parsed from the input file and
+    written to the output file one at a time instead of holding the whole
+    notebook in memory. options are extra keyword arguments for the
+    converter.
+
+    Raises json.JSONDecodeError if the input file is not valid JSON.
+    """
+    with open(in_filename, 'rb') as raw:
+        if stream:
+            return convert_notebook(NotebookReader(raw), in_filename, out_filename, directory,
+                                    stream, options)
+        with timer((options or {}).get('stats'), 'parse'):
+            t = json.load(raw)
+
+    return convert_notebook(t, in_filename, out_filename, directory, options=options)
+
+
+def convert_notebook(t, in_filename, out_filename, directory, stream=False, options=None):
+    """Convert a loaded notebook (or NotebookReader) into a Markdown file.
+
+    The 'formats' option lists extra FORMATS written from the same pass,
+    e.g. ['html'] also writes out_filename.html.
+    """
+    options = dict(options or {})
+    formats = options.pop('formats', None) or []
+    version = get_version(t)
+    if version == '0.7.1':
+        converter = NewConverter
+    elif version == '0.6.2':
+        converter = LegacyConverter
+
+    full_path = os.path.join(directory, out_filename + '.md')
+    with ExitStack() as files:
+        fout = files.enter_context(open(full_path, 'w'))
+        sinks = []
+        for name in formats:
+            extension, sink = FORMATS[name]
+            path = os.path.join(directory, out_filename + extension)
+            sinks.append(sink(files.enter_context(open(path, 'w'))))
+        zeppelin_converter = converter(in_filename, out_filename, directory, sinks=sinks,
+                                       **options)
+        zeppelin_converter.convert(t, fout, stream)
+
+    return full_path
+
+
+def convert_job(job, stream=False, options=None, collect_stats=False):
+    """Convert one notebook of a batch, returning (input, output, error, stats).
+
+    stats is the Stats.to_dict() of the conversion if collect_stats is True,
+    or None.
+    """
+    in_filename, directory = job
+    out_filename = os.path.splitext(os.path.basename(in_filename))[0]
+    stats = None
+    if collect_stats:
+        stats = Stats()
+        options = dict(options or {}, stats=stats)
+    try:
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+        full_path = convert_file(in_filename, out_filename, directory, stream, options)
+        return in_filename, full_path, None, stats and stats.to_dict()
+    except Exception as err:
+        return (in_filename, None, '{0}: {1}'.format(type(err).__name__, err),
+                stats and stats.to_dict())
+
+
+def batch_jobs(root, notebooks, output_root):
+    """Return a (notebook, output directory) job for every notebook found under root."""
+    # Images are numbered per notebook, so notebooks sharing an output
+    # directory each get a sub-directory of their own.
+    directories = [output_directory(root, notebook, output_root) for notebook in notebooks]
+    shared = Counter(directories)
+    jobs = []
+    for notebook, directory in zip(notebooks, directories):
+        if shared[directory] > 1:
+            stem = os.path.splitext(os.path.basename(notebook))[0]
+            directory = os.path.join(directory, stem)
+        jobs.append((notebook, directory))
+    return jobs
+
+
+def convert_batch(path, output_root, workers=None, stream=False, options=None, stats=None):
+    """Convert every notebook matching path across a pool of processes.
+
+    path is either a directory, searched recursively for .json files, or a
+    glob pattern. Outputs mirror the input layout under output_root.
+    The stats of every conversion are merged into stats, if given.
+    Returns the number of notebooks that failed to convert.
+    """
+    root, notebooks = find_notebooks(path)
+    if not notebooks:
+        print('ERROR: No notebooks found in ' + path, file=sys.stderr)
+        return 1
+
+    jobs = batch_jobs(root, notebooks, output_root)
+    failed = 0
+    start = time.time()
+
+    job = partial(convert_job, stream=stream, options=options,
+                  collect_stats=stats is not None)
+    # multiprocessing is only needed for batches
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for in_filename, full_path, error, job_stats in pool.map(job, jobs):
+            if job_stats is not None:
+                stats.merge(job_stats)
+            if error is None:
+                print('OK: {0} -> {1}'.format(in_filename, full_path))
+            else:
+                failed += 1
+                print('ERROR: {0}: {1}'.format(in_filename, error), file=sys.stderr)
+
+    elapsed = time.time() - start
+    converted = len(notebooks) - failed
+    print('Converted {0}/{1} notebooks in {2:.2f}s ({3:.1f} notebooks/s)'.format(
+          converted, len(notebooks), elapsed, converted / elapsed if elapsed else 0.0))
+    return failed
 
 
 def main():
@@ -25,14 +159,82 @@ def main():
     - Loads in Zeppelin notebook
     - Gets the version of the notebook
     - Converts it into markdown format
+
+    If the input is a directory or a glob pattern, every notebook found is
+    converted in parallel and the output is treated as a directory.
     """
     parser = argparse.ArgumentParser()
     parser.add_argument('-i', dest='in_filename', required=True,
-                        help='Zeppelin notebook input file (.json)')
+                        help='Zeppelin notebook input file (.json), directory or glob')
     parser.add_argument('-o', dest='out_filename',
-                        help='Markdown output file (.md) (optional)')
+                        help='Markdown output file (.md) or directory in batch mode (optional)')
+    parser.add_argument('-j', dest='workers', type=int, default=None,
+                        help='Number of worker processes in batch mode (optional)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Parse and write paragraphs incrementally '
+                             'to bound memory use (optional)')
+    parser.add_argument('--image-workers', dest='image_workers', type=int, default=0,
+                        help='Number of threads decoding images in the background (optional)')
+    parser.add_argument('--hash-images', dest='hash_images', action='store_true',
+                        help='Name images by a hash of their content (optional)')
+    parser.add_argument('--image-cache', dest='image_cache',
+                        help='Directory caching converted images across runs (optional)')
+    parser.add_argument('--paragraph-cache', dest='paragraph_cache',
+                        help='Directory caching rendered paragraphs across runs (optional)')
+    parser.add_argument('--max-table-rows', dest='max_table_rows', type=int,
+                        help='Maximum number of rows rendered per table (optional)')
+    parser.add_argument('--html', dest='formats', action='append_const', const='html',
+                        default=[], help='Also write an HTML page (optional)')
+    parser.add_argument('--summary', dest='formats', action='append_const', const='summary',
+                        help='Also write a JSON summary of titles, languages and errors '
+                             '(optional)')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep converting the notebooks of a directory or glob '
+                             'as they change (optional)')
+    parser.add_argument('--watch-interval', dest='watch_interval', type=float, default=1.0,
+                        help='Delay in seconds between checks for changes (optional)')
+    parser.add_argument('--debounce', dest='debounce', type=float, default=0.5,
+                        help='Time in seconds a notebook must stay unchanged before it is '
+                             'converted (optional)')
+    parser.add_argument('--watch-hash', dest='watch_hash', action='store_true',
+                        help='Detect changes by content hash instead of modification time '
+                             'and size (optional)')
+    parser.add_argument('--stats', dest='stats', nargs='?', const='-',
+                        help='Write timings and paragraph stats as JSON to this file, '
+                             'or stdout (stderr in batch mode) (optional)')
+    parser.add_argument('--stats-hook', dest='stats_hooks', action='append', default=[],
+                        metavar='MODULE:FUNCTION',
+                        help='Function called with every stats event (optional)')
     args = parser.parse_args()
     directory = ''
+    options = {'image_workers': args.image_workers,
+               'hash_images': args.hash_images,
+               'image_cache': args.image_cache,
+               'paragraph_cache': args.paragraph_cache,
+               'max_table_rows': args.max_table_rows,
+               'formats': args.formats}
+
+    stats = None
+    if args.stats or args.stats_hooks:
+        stats = Stats([load_hook(spec) for spec in args.stats_hooks])
+
+    if args.watch:
+        if not is_batch_input(args.in_filename):
+            print('ERROR: --watch needs a directory or a glob pattern')
+            sys.exit(1)
+        from .watch import Watcher
+        Watcher(args.in_filename, args.out_filename or '', args.watch_interval,
+                args.debounce, args.watch_hash, args.stream, options).run()
+        return
+
+    if is_batch_input(args.in_filename):
+        failed = convert_batch(args.in_filename, args.out_filename or '', args.workers,
+                               args.stream, options, stats)
+        # stdout already lists the converted notebooks
+        write_stats(stats, args.stats, sys.stderr)
+        sys.exit(1 if failed else 0)
+
+    options['stats'] = stats
 
     if args.out_filename:
         directory = os.path.dirname(args.out_filename)
@@ -42,24 +244,16 @@ def main():
     else:
         args.out_filename = 'knowledge'
 
-    with open(args.in_filename, 'rb') as raw:
-        try:
-            t = json.load(raw)
-            full_path = os.path.join(directory, args.out_filename + '.md')
-        except ValueError:
-            print('ERROR: Invalid JSON format')
-            sys.exit(1)
-
-    version = get_version(t)
-    if version == '0.7.1':
-        zeppelin_converter = NewConverter(args.in_filename, args.out_filename,
-                                          directory)
-    elif version == '0.6.2':
-        zeppelin_converter = LegacyConverter(args.in_filename, args.out_filename,
-                                             directory)
-
-    with open(full_path, 'w') as fout:
-        zeppelin_converter.convert(t, fout)
+    try:
+        convert_file(args.in_filename, args.out_filename, directory, args.stream, options)
+    except json.JSONDecodeError:
+        print('ERROR: Invalid JSON format')
+        sys.exit(1)
+    except Exception as err:
+        print('ERROR: Conversion failed: {0}: {1}'.format(type(err).__name__, err))
+        sys.exit(1)
+    finally:
+        write_stats(stats, args.stats)
 
 
 if __name__ == '__main__':
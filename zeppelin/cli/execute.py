@@ -7,7 +7,45 @@ import os
 import argparse
 import json
 import sys
+import threading
+from .utils import find_notebooks, is_batch_input, output_directory, write_stats
 from ..executors.notebook_executor import NotebookExecutor
+from ..stats import Stats, load_hook
+
+
+def find_inputs(paths, output_root):
+    """Return (notebook, output path) pairs for files, directories and globs.
+
+    Notebooks found in a directory or glob are saved under output_root in
+    the same layout as their input.
+    """
+    inputs = []
+    for path in paths:
+        if is_batch_input(path):
+            root, notebooks = find_notebooks(path)
+            for notebook in notebooks:
+                directory = output_directory(root, notebook, output_root) if output_root else ''
+                inputs.append((notebook, directory))
+        else:
+            inputs.append((path, output_root))
+
+    for notebook, directory in inputs:
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    return [(notebook, os.path.join(directory, '')) for notebook, directory in inputs]
+
+
+def paragraph_writer(fh):
+    """Return a callback writing each paragraph to fh as a line of JSON."""
+    lock = threading.Lock()
+
+    def write_paragraph(paragraph):
+        with lock:
+            fh.write(json.dumps(paragraph) + '\n')
+            fh.flush()
+
+    return write_paragraph
 
 
 def main():
@@ -16,33 +54,129 @@ def main():
     - Execute notebook
     - Save output to either file or display it in stderr
     - Display errors during the run if they exist
+
+    Given several notebooks, a directory or a glob, the notebooks are
+    executed concurrently and a summary of the results is displayed.
     """
     parser = argparse.ArgumentParser()
-    parser.add_argument('-i', dest='path_to_notebook_json', required=True,
-                        help='Zeppelin notebook input file (.json)')
+    parser.add_argument('-i', dest='path_to_notebook_json', required=True, nargs='+',
+                        help='Zeppelin notebook input files (.json), directories or globs')
     parser.add_argument('-o', dest='output_path', default=sys.stdout,
                         help='Path to save rendered output file (.json) (optional)')
     parser.add_argument('-u', dest='zeppelin_url', default='localhost:8890',
                         help='Zeppelin URL (optional)')
+    parser.add_argument('-j', dest='max_jobs', type=int, default=4,
+                        help='Maximum number of notebooks executing at once (optional)')
+    parser.add_argument('--timeout', dest='timeout', type=float, default=30,
+                        help='Timeout in seconds of each request to Zeppelin (optional)')
+    parser.add_argument('--pool-size', dest='pool_size', type=int, default=10,
+                        help='Number of pooled connections to Zeppelin (optional)')
+    parser.add_argument('--retries', dest='max_retries', type=int, default=3,
+                        help='Number of retries of failed requests (optional)')
+    parser.add_argument('--poll-interval', dest='poll_interval', type=float, default=0.5,
+                        help='Initial delay in seconds between status checks (optional)')
+    parser.add_argument('--poll-max-interval', dest='poll_max_interval', type=float,
+                        default=30, help='Maximum delay in seconds between status checks '
+                                         '(optional)')
+    parser.add_argument('--poll-backoff', dest='poll_backoff', type=float, default=2,
+                        help='Factor the delay grows by after each status check (optional)')
+    parser.add_argument('--poll-jitter', dest='poll_jitter', type=float, default=0.1,
+                        help='Random spread of each delay, as a fraction of it (optional)')
+    parser.add_argument('--deadline', dest='deadline', type=float,
+                        help='Maximum time in seconds to wait for the notebook (optional)')
+    parser.add_argument('--wait', dest='wait_mode', choices=['poll', 'websocket'],
+                        default='poll', help='Follow paragraph updates by polling or over '
+                                             'the Zeppelin WebSocket (optional)')
+    parser.add_argument('--stream-results', dest='stream_results', nargs='?', const='-',
+                        help='Write each paragraph as a JSON line to this file, or stdout, '
+                             'as soon as it finishes (optional)')
+    parser.add_argument('--fail-fast', dest='fail_fast', action='store_true',
+                        help='Stop the notebook at the first paragraph that fails (optional)')
+    parser.add_argument('--reuse', dest='reuse', choices=['name', 'hash'],
+                        help='Reuse an existing notebook with the same name, updating changed '
+                             'paragraphs, or with the same content (optional)')
+    parser.add_argument('--cleanup', dest='cleanup', action='store_true',
+                        help='Delete notebooks created by this run afterwards (optional)')
+    parser.add_argument('-p', '--paragraphs', dest='paragraphs', nargs='+',
+                        help='Only run these paragraphs, given as ids, indexes or start:end '
+                             'index ranges (optional)')
+    parser.add_argument('--changed', dest='state_file',
+                        help='Only run paragraphs changed since their last successful run, '
+                             'as recorded in this state file (optional)')
+    parser.add_argument('--downstream', dest='downstream', action='store_true',
+                        help='Also run every paragraph after the first selected one (optional)')
+    parser.add_argument('--stats', dest='stats', nargs='?', const='-',
+                        help='Write timings and paragraph stats as JSON to this file, '
+                             'or stderr (optional)')
+    parser.add_argument('--stats-hook', dest='stats_hooks', action='append', default=[],
+                        metavar='MODULE:FUNCTION',
+                        help='Function called with every stats event (optional)')
     args = parser.parse_args()
 
-    with open(args.path_to_notebook_json, 'rb') as notebook:
-        try:
-            t = json.load(notebook)
-            notebook_name = os.path.basename(args.path_to_notebook_json)
+    if args.output_path is sys.stdout:
+        args.output_path = ''
+    elif not os.path.isdir(args.output_path):
+        print('Output path given is not valid directory.')
+        sys.exit(1)
+
+    options = {'timeout': args.timeout,
+               'pool_size': args.pool_size,
+               'max_retries': args.max_retries,
+               'poll_interval': args.poll_interval,
+               'poll_max_interval': args.poll_max_interval,
+               'poll_backoff': args.poll_backoff,
+               'poll_jitter': args.poll_jitter,
+               'deadline': args.deadline,
+               'wait_mode': args.wait_mode,
+               'fail_fast': args.fail_fast,
+               'reuse': args.reuse,
+               'cleanup': args.cleanup,
+               'paragraphs': args.paragraphs,
+               'state_file': args.state_file,
+               'downstream': args.downstream}
+
+    if args.stats or args.stats_hooks:
+        options['stats'] = Stats([load_hook(spec) for spec in args.stats_hooks])
 
-            if args.output_path is sys.stdout:
-                args.output_path = ''
-            elif not os.path.isdir(args.output_path):
-                raise ValueError('Output path given is not valid directory.')
+    results_file = None
+    if args.stream_results == '-':
+        options['on_paragraph'] = paragraph_writer(sys.stdout)
+    elif args.stream_results:
+        results_file = open(args.stream_results, 'a')
+        options['on_paragraph'] = paragraph_writer(results_file)
 
+    try:
+        run_notebooks(args, options)
+    finally:
+        if results_file is not None:
+            results_file.close()
+
+
+def run_notebooks(args, options):
+    """Execute the notebooks given on the command line, exiting on failure."""
+    paths = args.path_to_notebook_json
+    if len(paths) > 1 or is_batch_input(paths[0]):
+        # asyncio is only needed for batches
+        from ..executors.async_executor import AsyncNotebookExecutor
+        executor = AsyncNotebookExecutor(args.zeppelin_url, args.max_jobs, **options)
+        results = executor.execute_notebooks(find_inputs(paths, args.output_path))
+        # stdout carries the progress messages and the executed notebooks
+        write_stats(options.get('stats'), args.stats, sys.stderr)
+        sys.exit(1 if not results or any(errors for path, errors, elapsed in results) else 0)
+
+    with open(paths[0], 'rb') as notebook:
+        try:
+            t = json.load(notebook)
+            notebook_name = os.path.basename(paths[0])
             output_path = os.path.join(args.output_path, '')
             notebook_executor = NotebookExecutor(notebook_name, output_path,
-                                                 args.zeppelin_url)
+                                                 args.zeppelin_url, **options)
             notebook_executor.execute_notebook(t)
         except ValueError as err:
             print(err)
             sys.exit(1)
+        finally:
+            write_stats(options.get('stats'), args.stats, sys.stderr)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,122 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import os
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .convert import convert_notebook
+from ..executors.notebook_executor import create_session
+
+
+def list_notebooks(session, zeppelin_url, timeout=30):
+    """Return the id and name of every notebook on the server."""
+    r = session.get('http://{0}/api/notebook'.format(zeppelin_url), timeout=timeout)
+    if r.status_code != 200:
+        print('ERROR: Could not list notebooks: HTTP {0}'.format(r.status_code),
+              file=sys.stderr)
+        sys.exit(1)
+    return r.json()['body']
+
+
+def fetch_notebook(session, zeppelin_url, notebook_id, timeout=30):
+    """Return a notebook with its paragraphs and results.
+
+    Raises ValueError if it can't be fetched.
+    """
+    r = session.get('http://{0}/api/notebook/{1}'.format(zeppelin_url, notebook_id),
+                    timeout=timeout)
+    if r.status_code != 200:
+        raise ValueError('HTTP {0}'.format(r.status_code))
+    return r.json()['body']
+
+
+def export_notebook(session, zeppelin_url, notebook_id, output_root, timeout=30, options=None):
+    """Fetch a notebook and convert it in memory, returning (id, output, error).
+
+    The Markdown is written to <output_root>/<notebook id>/note.md, the
+    layout of Zeppelin's notebook directory.
+    """
+    try:
+        t = fetch_notebook(session, zeppelin_url, notebook_id, timeout)
+        directory = os.path.join(output_root, notebook_id)
+        os.makedirs(directory, exist_ok=True)
+        full_path = convert_notebook(t, notebook_id, 'note', directory, options=options)
+        return notebook_id, full_path, None
+    except Exception as err:
+        return notebook_id, None, '{0}: {1}'.format(type(err).__name__, err)
+
+
+def export_notebooks(zeppelin_url, output_root, workers=4, timeout=30, max_retries=3,
+                     options=None, session=None):
+    """Convert every notebook on a Zeppelin server to Markdown under output_root.
+
+    Notebooks are fetched and converted by workers threads sharing a pool of
+    connections, without writing their JSON to disk. Returns the number of
+    notebooks that failed.
+    """
+    session = session or create_session(workers, max_retries)
+    notebooks = list_notebooks(session, zeppelin_url, timeout)
+    failed = 0
+    start = time.time()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        jobs = [pool.submit(export_notebook, session, zeppelin_url, notebook['id'],
+                            output_root, timeout, options) for notebook in notebooks]
+        for job in jobs:
+            notebook_id, full_path, error = job.result()
+            if error is None:
+                print('OK: {0} -> {1}'.format(notebook_id, full_path))
+            else:
+                failed += 1
+                print('ERROR: {0}: {1}'.format(notebook_id, error), file=sys.stderr)
+
+    elapsed = time.time() - start
+    exported = len(notebooks) - failed
+    print('Exported {0}/{1} notebooks in {2:.2f}s ({3:.1f} notebooks/s)'.format(
+          exported, len(notebooks), elapsed, exported / elapsed if elapsed else 0.0))
+    return failed
+
+
+def main():
+    """Entry point.
+
+    - Lists the notebooks of a Zeppelin server
+    - Fetches them concurrently
+    - Converts each into markdown format
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-u', dest='zeppelin_url', default='localhost:8890',
+                        help='Zeppelin URL (optional)')
+    parser.add_argument('-o', dest='output_root', default='',
+                        help='Directory the Markdown files are written to (optional)')
+    parser.add_argument('-j', dest='workers', type=int, default=4,
+                        help='Number of notebooks fetched and converted at once (optional)')
+    parser.add_argument('--timeout', dest='timeout', type=float, default=30,
+                        help='Timeout in seconds of each request to Zeppelin (optional)')
+    parser.add_argument('--retries', dest='max_retries', type=int, default=3,
+                        help='Number of retries of failed requests (optional)')
+    parser.add_argument('--hash-images', dest='hash_images', action='store_true',
+                        help='Name images by a hash of their content (optional)')
+    parser.add_argument('--image-cache', dest='image_cache',
+                        help='Directory caching converted images across runs (optional)')
+    parser.add_argument('--paragraph-cache', dest='paragraph_cache',
+                        help='Directory caching rendered paragraphs across runs (optional)')
+    parser.add_argument('--max-table-rows', dest='max_table_rows', type=int,
+                        help='Maximum number of rows rendered per table (optional)')
+    args = parser.parse_args()
+    options = {'hash_images': args.hash_images,
+               'image_cache': args.image_cache,
+               'paragraph_cache': args.paragraph_cache,
+               'max_table_rows': args.max_table_rows}
+
+    failed = export_notebooks(args.zeppelin_url, args.output_root, args.workers, args.timeout,
+                              args.max_retries, options)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import os
+import sys
+import glob
+
+
+def is_batch_input(path):
+    """Return True if path refers to a directory or a glob pattern."""
+    return os.path.isdir(path) or any(c in path for c in '*?[')
+
+
+def find_notebooks(path):
+    """Return (root, notebooks) for a directory or glob pattern.
+
+    A directory is searched recursively for .json files. The returned root
+    is the directory the notebooks' relative output paths are based on.
+    """
+    if os.path.isdir(path):
+        root = path
+        notebooks = glob.glob(os.path.join(path, '**', '*.json'), recursive=True)
+    else:
+        notebooks = [f for f in glob.glob(path, recursive=True) if os.path.isfile(f)]
+        if notebooks:
+            root = os.path.commonpath([os.path.dirname(f) or '.' for f in notebooks])
+        else:
+            root = ''
+
+    return root, sorted(notebooks)
+
+
+def output_directory(root, notebook, output_root):
+    """Mirror the notebook's location under root into output_root."""
+    relative = os.path.relpath(os.path.dirname(notebook) or '.', root or '.')
+    return os.path.normpath(os.path.join(output_root, relative))
+
+
+def write_stats(stats, path, console=None):
+    """Write stats as JSON to path, or console if path is '-'. Does nothing without a path.
+
+    console defaults to stdout. Pass stderr when stdout carries other
+    output, so both stay parseable.
+    """
+    if path is None:
+        return
+    if path == '-':
+        stats.write(console or sys.stdout)
+    else:
+        with open(path, 'w') as fh:
+            stats.write(fh)
@@ -0,0 +1,134 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import os
+import sys
+import time
+import hashlib
+from .convert import batch_jobs, convert_job
+from .utils import find_notebooks
+
+
+def file_hash(path):
+    """Return the SHA-1 of a file's content."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Watcher():
+    """Watcher keeps the Markdown of a directory of notebooks up to date.
+
+    The notebooks matching path are checked every interval seconds, and a
+    notebook is converted again once it changed and then stayed unchanged
+    for debounce seconds, so a burst of saves is converted only once.
+
+    Changes are detected by modification time and size, or by content hash
+    with use_hash, in which case saves that don't change the content are
+    ignored. Notebooks whose Markdown is newer than them are not converted
+    on start.
+    """
+
+    def __init__(self, path, output_root, interval=1.0, debounce=0.5, use_hash=False,
+                 stream=False, options=None):
+        """Initialize with the stream and converter options used for every conversion."""
+        self.path = path
+        self.output_root = output_root
+        self.interval = interval
+        self.debounce = debounce
+        self.use_hash = use_hash
+        self.stream = stream
+        self.options = options
+        self.signatures = {}
+        self.pending = {}
+        self.started = False
+
+    def signature(self, path, previous=None):
+        """Return what identifies the current version of a notebook.
+
+        The content is only hashed when the modification time or size
+        differ from previous.
+        """
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size, None)
+        if self.use_hash:
+            if previous is not None and previous[:2] == signature[:2]:
+                return previous
+            signature = signature[:2] + (file_hash(path),)
+        return signature
+
+    def changed(self, old, new):
+        """Return True if the notebook changed between two signatures."""
+        if old is None:
+            return True
+        if self.use_hash:
+            return old[2] != new[2]
+        return old != new
+
+    def up_to_date(self, notebook, directory):
+        """Return True if the Markdown of notebook is newer than it."""
+        stem = os.path.splitext(os.path.basename(notebook))[0]
+        output = os.path.join(directory, stem + '.md')
+        try:
+            return os.stat(output).st_mtime_ns >= os.stat(notebook).st_mtime_ns
+        except OSError:
+            return False
+
+    def poll(self, now=None):
+        """Check the notebooks once and convert the ones ready.
+
+        Returns the (input, output, error) of every conversion.
+        """
+        now = time.monotonic() if now is None else now
+        root, notebooks = find_notebooks(self.path)
+        first = not self.started
+        self.started = True
+        results = []
+
+        jobs = batch_jobs(root, notebooks, self.output_root)
+        for notebook, directory in jobs:
+            previous = self.signatures.get(notebook)
+            try:
+                signature = self.signature(notebook, previous)
+            except OSError:
+                continue  # removed since it was listed
+            self.signatures[notebook] = signature
+
+            if first and self.up_to_date(notebook, directory):
+                continue
+            if self.changed(previous, signature):
+                self.pending[notebook] = now
+
+        for notebook, directory in jobs:
+            if notebook in self.pending and now - self.pending[notebook] >= self.debounce:
+                del self.pending[notebook]
+                in_filename, full_path, error, stats = convert_job(
+                    (notebook, directory), self.stream, self.options)
+                results.append((in_filename, full_path, error))
+
+        found = set(notebooks)
+        for notebook in list(self.signatures):
+            if notebook not in found:
+                del self.signatures[notebook]
+                self.pending.pop(notebook, None)
+
+        return results
+
+    def run(self):
+        """Convert changed notebooks until interrupted."""
+        print('Watching {0} for changes...'.format(self.path))
+        try:
+            while True:
+                for in_filename, full_path, error in self.poll():
+                    if error is None:
+                        print('OK: {0} -> {1}'.format(in_filename, full_path))
+                    else:
+                        print('ERROR: {0}: {1}'.format(in_filename, error), file=sys.stderr)
+                    sys.stdout.flush()
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            pass
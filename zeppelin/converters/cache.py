@@ -0,0 +1,76 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import os
+import json
+import hashlib
+
+
+class ParagraphCache():
+    """ParagraphCache keeps the Markdown rendered for each paragraph on disk.
+
+    Entries are keyed on the paragraph id and a digest of everything that
+    affects its rendering (title, text, editor mode, results and the
+    converter settings), so an unchanged paragraph can be reused without
+    processing it again.
+    """
+
+    def __init__(self, cache_dir, key, settings=None):
+        """Load the cache file for key (usually the output path) from cache_dir.
+
+        settings is a JSON serializable value describing the converter
+        options that change the rendering, e.g. the maximum number of table
+        rows. Entries rendered with other settings are not reused.
+        """
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json'
+        self.path = os.path.join(cache_dir, name)
+        self.settings = settings
+        self.entries = {}
+        self.seen = {}
+
+        try:
+            with open(self.path) as fh:
+                self.entries = json.load(fh)
+        except (OSError, ValueError):
+            pass
+
+    def digest(self, paragraph, result_key):
+        """Return a digest of the parts of paragraph that are rendered."""
+        content = [paragraph.get('title'), paragraph.get('text'),
+                   paragraph.get('config', {}).get('editorMode'),
+                   paragraph.get(result_key), self.settings]
+        return hashlib.sha1(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def get(self, paragraph_id, digest):
+        """Return the cached lines for a paragraph, or None if out of date.
+
+        An entry is only valid if every image it references still exists.
+        """
+        entry = self.entries.get(paragraph_id)
+        if entry is None or entry['digest'] != digest:
+            return None
+        if not all(os.path.exists(image) for image in entry['images']):
+            return None
+
+        self.seen[paragraph_id] = entry
+        return entry['lines']
+
+    def put(self, paragraph_id, digest, lines, images):
+        """Record the lines and images rendered for a paragraph."""
+        self.seen[paragraph_id] = {'digest': digest, 'lines': lines, 'images': images}
+
+    def save(self):
+        """Write the paragraphs seen in this run back to disk.
+
+        Paragraphs no longer in the notebook, or whose images could not be
+        written, are dropped.
+        """
+        entries = {paragraph_id: entry for paragraph_id, entry in self.seen.items()
+                   if all(os.path.exists(image) for image in entry['images'])}
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path + '.tmp', 'w') as fh:
+            json.dump(entries, fh)
+        os.replace(self.path + '.tmp', self.path)
@@ -0,0 +1,41 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import re
+import functools
+from datetime import datetime
+
+# Zeppelin writes dates as e.g. "Dec 17, 2016 3:32:15 PM"
+ZEPPELIN_DATE = re.compile(r'([A-Z][a-z]{2}) (\d{1,2}), (\d{4}) (\d{1,2}):(\d{2}):(\d{2}) ([AP]M)$')
+
+MONTHS = {name: index + 1 for index, name in enumerate(
+          ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])}
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_date(text):
+    """Parse a paragraph date, returning the same result as dateutil.
+
+    Dates in the format written by Zeppelin are parsed directly; anything
+    else falls back to dateutil's generic parser.
+    """
+    match = ZEPPELIN_DATE.match(text)
+    if match:
+        month, day, year, hour, minute, second, meridiem = match.groups()
+        hour = int(hour)
+        if month in MONTHS and 1 <= hour <= 12:
+            if meridiem == 'AM':
+                hour = 0 if hour == 12 else hour
+            else:
+                hour = 12 if hour == 12 else hour + 12
+            try:
+                return datetime(int(year), MONTHS[month], int(day), hour,
+                                int(minute), int(second))
+            except ValueError:
+                pass
+
+    # dateutil is slow to import and rarely needed, so only load it here
+    from dateutil.parser import parse
+    return parse(text)
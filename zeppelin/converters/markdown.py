@@ -5,10 +5,123 @@
 
 import abc
 import os
-import cairosvg
 import re
+import sys
+import json
 import base64
-from dateutil.parser import parse
+import hashlib
+import shutil
+import functools
+import threading
+import time
+from .cache import ParagraphCache
+from .dates import parse_date
+from ..model import Notebook, Paragraph
+from ..stats import instrument
+
+# Number of table rows joined into a single output chunk
+TABLE_CHUNK_ROWS = 1000
+
+# Matches a blank or single column row between two line breaks
+PLAIN_ROW = re.compile('\n[^\t\n]*\n')
+
+# Marks an SVG image in a 0.6.2 result
+SVG_PATTERN = re.compile('xml version')
+
+# Marks the start of the base64 payload of an image embedded in HTML
+BASE64_PREFIX = 'base64,'
+
+# Number of base64 characters decoded at a time, a multiple of 4
+BASE64_CHUNK = 1 << 16
+
+# Characters base64 decoding skips, e.g. line breaks
+NON_BASE64 = re.compile('[^A-Za-z0-9+/=]')
+
+# Editor modes whose results are not rendered
+SKIPPED_MODES = frozenset(['text', 'markdown'])
+
+
+def md_row(row):
+    """Translate a tab separated row into a markdown table row."""
+    if '\t' in row:
+        return '|' + row.replace('\t', '|') + '|'
+    return row
+
+
+@functools.lru_cache(maxsize=256)
+def editor_mode(name):
+    """Return the mode of an editorMode setting, e.g. 'scala' for 'ace/mode/scala'."""
+    return name.rsplit('/', 1)[-1]
+
+
+class ImageMatch():
+    """ImageMatch locates an image payload in a message like a regex match.
+
+    group(1) is the payload, found between start and end in msg. It is
+    only copied out of msg when group() is called.
+    """
+
+    def __init__(self, msg, start, end):
+        self.msg = msg
+        self.span_start = start
+        self.span_end = end
+
+    def start(self, group=1):
+        return self.span_start
+
+    def end(self, group=1):
+        return self.span_end
+
+    def group(self, group=0):
+        return self.msg[self.span_start:self.span_end]
+
+
+def find_base64(msg):
+    """Return an ImageMatch of the payload after 'base64,' up to the next quote, or None."""
+    start = msg.find(BASE64_PREFIX)
+    if start == -1:
+        return None
+    start += len(BASE64_PREFIX)
+    end = msg.find('"', start)
+    if end == -1:
+        return None
+    return ImageMatch(msg, start, end)
+
+
+def payload_digest(msg, start=0, end=None):
+    """Return the SHA-1 of msg[start:end] encoded as UTF-8, hashing it in chunks."""
+    end = len(msg) if end is None else end
+    digest = hashlib.sha1()
+    for offset in range(start, end, BASE64_CHUNK):
+        digest.update(msg[offset:min(offset + BASE64_CHUNK, end)].encode('utf-8'))
+    return digest.hexdigest()
+
+
+def write_base64(msg, fh, start=0, end=None):
+    """Decode the base64 image in msg[start:end] and write it to fh.
+
+    The payload is decoded in chunks, so only a chunk of it is copied at a
+    time. Like base64.b64decode, characters outside the base64 alphabet
+    are skipped.
+    """
+    end = len(msg) if end is None else end
+    rest = ''
+    for offset in range(start, end, BASE64_CHUNK):
+        chunk = rest + msg[offset:min(offset + BASE64_CHUNK, end)]
+        if NON_BASE64.search(chunk):
+            chunk = NON_BASE64.sub('', chunk)
+        usable = len(chunk) - len(chunk) % 4
+        fh.write(base64.b64decode(chunk[:usable]))
+        rest = chunk[usable:]
+    if rest:
+        fh.write(base64.b64decode(rest))
+
+
+def write_svg(svg, fh):
+    """Rasterize an SVG image to PNG and write it to fh."""
+    # cairosvg loads the whole cairo stack, so only import it for SVGs
+    import cairosvg
+    cairosvg.svg2png(bytestring=svg.encode('utf-8'), write_to=fh)
 
 
 class MarkdownConverter(abc.ABC):
@@ -19,8 +132,37 @@ class MarkdownConverter(abc.ABC):
         pass
 
     def __init__(self, input_filename, output_filename, directory, user='anonymous',
-                 date_created='N/A', date_updated='N/A'):
-        """Initialize class object with attributes based on CLI inputs."""
+                 date_created='N/A', date_updated='N/A', image_workers=0,
+                 hash_images=False, image_cache=None, paragraph_cache=None,
+                 max_table_rows=None, output_handlers=None, stats=None, sinks=None):
+        """Initialize class object with attributes based on CLI inputs.
+
+        If image_workers is greater than zero, images are decoded and
+        written by a pool of that many threads while the Markdown is built.
+
+        If hash_images is True, images are named after a hash of their
+        encoded payload and identical images are only written once. Giving
+        an image_cache directory keeps converted images there across runs
+        (and implies hash_images).
+
+        Giving a paragraph_cache directory reuses the Markdown rendered for
+        paragraphs that did not change since the last conversion. Images
+        are then always content-addressed, as their names are cached too.
+
+        If max_table_rows is set, only that many rows of each table are
+        rendered.
+
+        output_handlers maps output types to functions called with the
+        converter and the output data, overriding the built-in handlers.
+
+        Giving a Stats collects the time spent in each phase of the
+        conversion and the duration and output size of every paragraph.
+
+        sinks is a list of Sink objects fed from the same pass over the
+        paragraphs, e.g. to write an HTML page or a JSON summary alongside
+        the Markdown. Paragraphs are always rendered when sinks are given,
+        so the paragraph cache is only refreshed.
+        """
         self.index = 0
         self.input_filename = input_filename
         self.output_filename = output_filename
@@ -28,15 +170,65 @@ class MarkdownConverter(abc.ABC):
         self.user = user
         self.date_created = date_created
         self.date_updated = date_updated
+        self.max_table_rows = max_table_rows
         self.out = []
+        self.fout = None
+        self.written = False
+        self.hash_images = hash_images or image_cache is not None or paragraph_cache is not None
+        self.image_cache = image_cache
+        self.images = set()
+        self.image_pool = None
+        self.image_jobs = []
+        self.image_errors = []
+        self.fragment = None
+        self.fragment_images = None
+        self.paragraph_cache = None
+        self.stats = stats
+        self.size = 0
+        self.sinks = list(sinks or [])
+
+        if stats is not None:
+            instrument(self, stats, {'process_date_created': 'dates',
+                                     'process_date_updated': 'dates',
+                                     'process_input': 'input',
+                                     'build_text': 'text',
+                                     'build_table': 'tables',
+                                     'add_image': 'images',
+                                     'save_image': 'image_writes',
+                                     'rasterize_svg': 'svg',
+                                     'build_output': 'output'})
+
+        if paragraph_cache is not None:
+            key = '{0}:{1}'.format(os.path.join(directory, output_filename),
+                                   type(self).__name__)
+            handlers = {output_type: '{0}.{1}'.format(handler.__module__, handler.__qualname__)
+                        for output_type, handler in (output_handlers or {}).items()}
+            settings = {'max_table_rows': max_table_rows, 'output_handlers': handlers}
+            self.paragraph_cache = ParagraphCache(paragraph_cache, key, settings)
+
+        if image_workers > 0:
+            # concurrent.futures pulls in logging, so only import it when used
+            from concurrent.futures import ThreadPoolExecutor
+            self.image_pool = ThreadPoolExecutor(max_workers=image_workers)
+            # Bound the number of pending images held in memory
+            self.image_slots = threading.BoundedSemaphore(image_workers * 2)
 
         # To add support for other output types, add the file type to
-        # the dictionary and create the necessary function to handle it.
+        # the dictionary and create the necessary function to handle it,
+        # or pass it in output_handlers.
         self.output_options = {
             'HTML': self.build_image,
             'TEXT': self.build_text,
-            'TABLE': self.build_table
+            'TABLE': self.build_table,
+            'IMG': self.build_img,
+            'SVG': self.build_svg,
+            'NETWORK': self.build_network,
+            'ANGULAR': self.skip_output,  # needs a live Angular scope
+            'NULL': self.skip_output
         }
+        for output_type, handler in (output_handlers or {}).items():
+            self.output_options[output_type] = functools.partial(handler, self)
+        self.unknown_outputs = set()
 
     def build_header(self, title):
         """Generate the header for the Markdown file."""
@@ -50,18 +242,40 @@ class MarkdownConverter(abc.ABC):
                   'thumbnail: ',
                   '---']
 
-        self.out = header + self.out
+        if self.fout is None:
+            self.out = header + self.out
+        else:
+            for line in header:
+                self.write(line)
+
+    def write(self, line):
+        """Append a line to the output.
+
+        Lines are buffered in self.out, or written straight to self.fout
+        when streaming.
+        """
+        if self.fragment is not None:
+            self.fragment.append(line)
+        self.size += len(line)
+
+        if self.fout is None:
+            self.out.append(line)
+        else:
+            if self.written:
+                self.fout.write('\n')
+            self.fout.write(line)
+            self.written = True
 
     def build_markdown(self, lang, body):
         """Append paragraphs body to output string."""
         if body is not None:
-            self.out.append(body)
+            self.write(body)
 
     def build_code(self, lang, body):
         """Wrap text with markdown specific flavour."""
-        self.out.append("```" + lang)
+        self.write("```" + lang)
         self.build_markdown(lang, body)
-        self.out.append("```")
+        self.write("```")
 
     def process_input(self, paragraph):
         """Parse paragraph for the language of the code and the code itself."""
@@ -77,6 +291,9 @@ class MarkdownConverter(abc.ABC):
         else:
             lang = lang.strip()[1:]
 
+        for sink in self.sinks:
+            sink.add_input(lang, body)
+
         if lang == 'md':
             self.build_markdown(lang, body)
         else:
@@ -86,26 +303,14 @@ class MarkdownConverter(abc.ABC):
         """Translate row into markdown format."""
         if not row:
             return
-        cols = row.split('\t')
-        if len(cols) == 1:
-            self.out.append(cols[0])
+        if header and '\t' in row:
+            self.write(md_row(row) + '\n|' + '-|' * (row.count('\t') + 1))
         else:
-            col_md = '|'
-            underline_md = '|'
-
-            if cols:
-                for col in cols:
-                    col_md += col + '|'
-                    underline_md += '-|'
-
-            if header:
-                self.out.append(col_md + '\n' + underline_md)
-            else:
-                self.out.append(col_md)
+            self.write(md_row(row))
 
     def process_date_created(self, text):
         """Set date_created to the oldest date (date created)."""
-        date = parse(text)
+        date = parse_date(text)
         if self.date_created == 'N/A':
             self.date_created = date
         if date < self.date_created:
@@ -113,7 +318,7 @@ class MarkdownConverter(abc.ABC):
 
     def process_date_updated(self, text):
         """Set date_updated to the most recent date (updated date)."""
-        date = parse(text)
+        date = parse_date(text)
         if self.date_updated == 'N/A':
             self.date_updated = date
         if date > self.date_updated:
@@ -124,7 +329,9 @@ class MarkdownConverter(abc.ABC):
 
         This is done to bold the title in markdown.
         """
-        self.out.append('#### ' + text)
+        self.write('#### ' + text)
+        for sink in self.sinks:
+            sink.add_title(text)
 
     def build_output(self, fout):
         """Squash self.out into string.
@@ -134,15 +341,55 @@ class MarkdownConverter(abc.ABC):
         """
         fout.write('\n'.join([s for s in self.out]))
 
-    def convert(self, json, fout):
+    def convert(self, json, fout, stream=False):
         """Convert json to markdown.
 
         Takes in a .json file as input and convert it to Markdown format,
         saving the generated .png images into ./images.
+
+        Raises the error of the first image that could not be written.
+
+        If stream is True, each paragraph is written to fout as soon as it
+        is processed. The header is built first from a pass over the
+        paragraphs' metadata only, so the output is identical either way.
         """
-        self.build_markdown_body(json)  # create the body
-        self.build_header(json['name'])  # create the md header
-        self.build_output(fout)  # write body and header to output file
+        if stream:
+            self.fout = fout
+            self.build_metadata(json)  # collect the header fields
+            self.build_header(json['name'])  # write the md header
+            self.start_sinks(json['name'])
+            self.build_markdown_body(json)  # write the body
+        else:
+            self.start_sinks(json['name'])
+            self.build_markdown_body(json)  # create the body
+            self.build_header(json['name'])  # create the md header
+            self.build_output(fout)  # write body and header to output file
+
+        self.wait_for_images()
+        if self.image_errors:
+            # Fail as the conversion would have without image workers
+            raise self.image_errors[0][1]
+
+        for sink in self.sinks:
+            sink.finish(self.user, self.date_created, self.date_updated)
+
+        if self.paragraph_cache is not None:
+            self.paragraph_cache.save()
+
+    def start_sinks(self, title):
+        """Begin the notebook in every sink."""
+        for sink in self.sinks:
+            sink.start(title)
+
+    def build_metadata(self, text):
+        """Collect the user and dates used in the header from every paragraph."""
+        for paragraph in Notebook(text).paragraphs:
+            if paragraph.user is not None:
+                self.user = paragraph.user
+            if paragraph.date_created is not None:
+                self.process_date_created(paragraph.date_created)
+            if paragraph.date_updated is not None:
+                self.process_date_updated(paragraph.date_updated)
 
     def build_markdown_body(self, text):
         """Generate the body for the Markdown file.
@@ -155,36 +402,172 @@ class MarkdownConverter(abc.ABC):
             - the input by detecting the editor language
             - the output by detecting the output format
         """
-        key_options = {
-            'dateCreated': self.process_date_created,
-            'dateUpdated': self.process_date_updated,
-            'title': self.process_title,
-            'text': self.process_input
-        }
+        for index, paragraph in enumerate(Notebook(text).paragraphs):
+            if self.stats is None:
+                self.build_paragraph(paragraph)
+                continue
+
+            start = time.perf_counter()
+            size = self.size
+            self.build_paragraph(paragraph)
+            self.stats.add_paragraph(notebook=self.input_filename, index=index,
+                                     id=paragraph.id,
+                                     seconds=time.perf_counter() - start,
+                                     chars=self.size - size)
+
+    def build_paragraph(self, paragraph):
+        """Generate the Markdown of a single Paragraph."""
+        if paragraph.user is not None:
+            self.user = paragraph.user
+
+        if self.paragraph_cache is not None and paragraph.id is not None:
+            self.build_cached_paragraph(paragraph)
+            return
+
+        if paragraph.date_created is not None:
+            self.process_date_created(paragraph.date_created)
+        if paragraph.date_updated is not None:
+            self.process_date_updated(paragraph.date_updated)
+        self.build_content(paragraph)
+
+    def build_cached_paragraph(self, paragraph):
+        """Reuse the cached Markdown of a paragraph or render and cache it."""
+        if paragraph.date_created is not None:
+            self.process_date_created(paragraph.date_created)
+        if paragraph.date_updated is not None:
+            self.process_date_updated(paragraph.date_updated)
+
+        digest = self.paragraph_cache.digest(paragraph.raw, self._RESULT_KEY)
+        # Sinks need every paragraph rendered, so only refresh the cache
+        lines = None if self.sinks else self.paragraph_cache.get(paragraph.id, digest)
+        if self.stats is not None:
+            self.stats.count('paragraph_cache_misses' if lines is None
+                             else 'paragraph_cache_hits')
+        if lines is not None:
+            for line in lines:
+                self.write(line)
+            return
+
+        self.fragment = []
+        self.fragment_images = []
+        self.build_content(paragraph)
+
+        self.paragraph_cache.put(paragraph.id, digest, self.fragment, self.fragment_images)
+        self.fragment = None
+        self.fragment_images = None
 
-        for paragraph in text['paragraphs']:
-            if 'user' in paragraph:
-                self.user = paragraph['user']
+    def build_content(self, paragraph):
+        """Generate the Markdown of the title, input and outputs of a Paragraph."""
+        for sink in self.sinks:
+            sink.begin_paragraph(paragraph)
 
-            for key, handler in key_options.items():
-                if key in paragraph:
-                    handler(paragraph[key])
+        if paragraph.title is not None:
+            self.process_title(paragraph.title)
+        if paragraph.text is not None:
+            self.process_input(paragraph.text)
+        if paragraph.result_key == self._RESULT_KEY:
+            self.render_outputs(paragraph)
 
-            if self._RESULT_KEY in paragraph:
-                self.process_results(paragraph)
+        for sink in self.sinks:
+            sink.end_paragraph(paragraph)
+
+    def process_results(self, paragraph):
+        """Route the outputs of a paragraph JSON dict to their handlers."""
+        self.render_outputs(Paragraph(paragraph))
+
+    def render_outputs(self, paragraph):
+        """Route the outputs of a Paragraph to their handlers."""
+        if self.renders_outputs(paragraph):
+            for output_type, data in paragraph.outputs:
+                self.render_output(output_type, data)
+
+    def render_output(self, output_type, msg):
+        """Pass an output to the handler of its type.
+
+        Outputs of unknown types are skipped with a warning.
+        """
+        handler = self.output_options.get(output_type)
+        if handler is not None:
+            handler(msg)
+        elif output_type not in self.unknown_outputs:
+            self.unknown_outputs.add(output_type)
+            print('WARNING: Skipping unsupported output type {0}'.format(output_type),
+                  file=sys.stderr)
+
+    def skip_output(self, msg):
+        """Ignore outputs that can't be rendered statically."""
 
     def build_text(self, msg):
         """Add text to output array."""
-        self.out.append(msg)
+        self.write(msg)
+        for sink in self.sinks:
+            sink.add_text(msg)
 
     def build_table(self, msg):
-        """Format each row of the table."""
-        rows = msg.split('\n')
-        if rows:
-            header_row, *body_rows = rows
-            self.create_md_row(header_row, True)
-            for row in body_rows:
-                self.create_md_row(row)
+        """Format each row of the table.
+
+        If every body row has several columns, the body is converted at once.
+        Otherwise body rows are written in chunks of TABLE_CHUNK_ROWS lines.
+        If max_table_rows is set, the rows past it are replaced by a note
+        saying how many were left out.
+        """
+        header, _, body = msg.partition('\n')
+        self.create_md_row(header, True)
+        body = body.rstrip('\n')
+        fits = self.max_table_rows is None or body.count('\n') < self.max_table_rows
+        if not body:
+            rows = [header]
+        elif fits and PLAIN_ROW.search('\n' + body + '\n') is None:
+            self.write('|' + body.replace('\t', '|').replace('\n', '|\n|') + '|')
+            rows = None
+        else:
+            rows = msg.split('\n')
+
+        end = truncated = 0
+        if rows is not None:
+            end = len(rows)
+            if self.max_table_rows is not None:
+                end = min(end, self.max_table_rows + 1)
+
+            for start in range(1, end, TABLE_CHUNK_ROWS):
+                chunk = [row for row in rows[start:min(start + TABLE_CHUNK_ROWS, end)] if row]
+                if not chunk:
+                    continue
+                if all('\t' in row for row in chunk):
+                    # Every row is a table row, so the chunk is converted at once
+                    self.write('|' + '|\n|'.join(chunk).replace('\t', '|') + '|')
+                else:
+                    self.write('\n'.join([md_row(row) for row in chunk]))
+
+            truncated = sum(1 for row in rows[end:] if row)
+            if truncated:
+                self.write('\n_{0} more rows truncated_'.format(truncated))
+
+        if self.sinks:
+            # Split the cells once for every sink
+            if rows is None:
+                rows = [header] + body.split('\n')
+                end = len(rows)
+            cells = [row.split('\t') for row in rows[:end] if row]
+            for sink in self.sinks:
+                sink.add_table(cells, truncated)
+
+    def build_network(self, msg):
+        """Format a network graph as a table of nodes and a table of edges."""
+        try:
+            graph = json.loads(msg)
+        except ValueError:
+            self.build_text(msg)
+            return
+
+        for name, columns in (('nodes', ('id', 'label')),
+                              ('edges', ('source', 'target', 'label'))):
+            items = graph.get(name) or []
+            if items:
+                rows = ['\t'.join(columns)]
+                rows.extend('\t'.join(str(item.get(column, '')) for column in columns)
+                            for item in items)
+                self.build_table('\n'.join(rows))
 
     def build_image(self, msg):
         """Convert base64 encoding to png.
@@ -197,7 +580,34 @@ class MarkdownConverter(abc.ABC):
         if result is None:
             return
 
-        self.index += 1
+        self.add_image(functools.partial(self.get_image_digest, msg, result),
+                       functools.partial(self.write_image_to_disk, msg, result))
+
+    def build_img(self, msg):
+        """Write an IMG output, a bare base64 encoded PNG."""
+        start, end = 0, len(msg)
+        while start < end and msg[start].isspace():
+            start += 1
+        while end > start and msg[end - 1].isspace():
+            end -= 1
+        self.add_image(functools.partial(payload_digest, msg, start, end),
+                       functools.partial(write_base64, msg, start=start, end=end))
+
+    def build_svg(self, msg):
+        """Rasterize an SVG output to PNG."""
+        self.add_image(functools.partial(payload_digest, msg),
+                       functools.partial(self.rasterize_svg, msg))
+
+    def rasterize_svg(self, msg, fh):
+        """Rasterize an SVG image to PNG and write it to fh."""
+        write_svg(msg, fh)
+
+    def add_image(self, digest, write):
+        """Save an image and link it from the output.
+
+        digest() returns a hash identifying the image, only needed when
+        images are content-addressed, and write(fh) writes it as PNG.
+        """
         images_path = 'images'
 
         if self.directory:
@@ -206,23 +616,105 @@ class MarkdownConverter(abc.ABC):
         if not os.path.isdir(images_path):
             os.makedirs(images_path)
 
-        with open('{0}/output_{1}.png'.format(images_path, self.index), 'wb') as fh:
-            self.write_image_to_disk(msg, result, fh)
+        if self.hash_images:
+            name = digest()
+        else:
+            self.index += 1
+            name = 'output_{0}'.format(self.index)
+
+        path = '{0}/{1}.png'.format(images_path, name)
+        if path in self.images or (self.hash_images and os.path.exists(path)):
+            pass  # the same image has already been written
+        elif self.image_pool is None:
+            self.save_image(path, name, write)
+        else:
+            self.image_slots.acquire()
+            future = self.image_pool.submit(self.save_image, path, name, write)
+            future.add_done_callback(lambda f: self.image_slots.release())
+            self.image_jobs.append((path, future))
+        self.images.add(path)
+
+        if self.fragment_images is not None:
+            self.fragment_images.append(path)
+
+        self.write(
+            '\n![png]({0}/{1}.png)\n'.format(images_path, name))
+        for sink in self.sinks:
+            # Sinks write next to the Markdown file, inside directory
+            sink.add_image('images/{0}.png'.format(name))
+
+    def save_image(self, path, name, write):
+        """Write a single image to path, going through the image cache if set.
+
+        Content-addressed images are written to a temporary file first, so
+        an interrupted write is never mistaken for a finished image.
+        """
+        if not self.hash_images:
+            with open(path, 'wb') as fh:
+                write(fh)
+            return
+
+        cached = None
+        if self.image_cache:
+            cached = os.path.join(self.image_cache, name + '.png')
+            if os.path.exists(cached):
+                self.copy_image(cached, path)
+                return
+
+        tmp = self.temporary_path(path)
+        with open(tmp, 'wb') as fh:
+            write(fh)
+        os.replace(tmp, path)
+
+        if cached:
+            os.makedirs(self.image_cache, exist_ok=True)
+            self.copy_image(path, cached)
+
+    def copy_image(self, src, dst):
+        """Atomically copy an image file."""
+        tmp = self.temporary_path(dst)
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+
+    def temporary_path(self, path):
+        """Return a temporary file name next to path unique to this thread."""
+        return '{0}.{1}-{2}.tmp'.format(path, os.getpid(), threading.get_ident())
+
+    def wait_for_images(self):
+        """Wait for every queued image to be written.
+
+        Images that failed are reported in stderr and kept in
+        self.image_errors as (path, error) pairs.
+        """
+        if self.image_pool is None:
+            return
+
+        for path, future in self.image_jobs:
+            try:
+                future.result()
+            except Exception as err:
+                self.image_errors.append((path, err))
+                print('ERROR: Could not write image {0}: {1}'.format(path, err),
+                      file=sys.stderr)
 
-        self.out.append(
-            '\n![png]({0}/output_{1}.png)\n'.format(images_path, self.index))
+        self.image_jobs = []
+        self.image_pool.shutdown()
 
     @abc.abstractmethod
     def find_message(self, msg):
         """Use regex to find encoded image."""
 
+    @abc.abstractmethod
+    def get_image_digest(self, msg, result):
+        """Return the SHA-1 of the encoded image found in msg."""
+
     @abc.abstractmethod
     def write_image_to_disk(self, msg, result, fh):
         """Decode message to PNG and write to disk."""
 
     @abc.abstractmethod
-    def process_results(self, paragraph):
-        """Route Zeppelin output types to corresponding handlers."""
+    def renders_outputs(self, paragraph):
+        """Return True if the outputs of the Paragraph are rendered."""
 
 
 class LegacyConverter(MarkdownConverter):
@@ -232,17 +724,19 @@ class LegacyConverter(MarkdownConverter):
 
     def find_message(self, msg):
         """Use regex to find encoded image."""
-        return re.search('xml version', msg)
+        return SVG_PATTERN.search(msg)
+
+    def get_image_digest(self, msg, result):
+        """Return the SHA-1 of the encoded image found in msg."""
+        return payload_digest(msg)
 
     def write_image_to_disk(self, msg, result, fh):
         """Decode message to PNG and write to disk."""
-        cairosvg.svg2png(bytestring=msg.encode('utf-8'), write_to=fh)
+        self.rasterize_svg(msg, fh)
 
-    def process_results(self, paragraph):
-        """Route Zeppelin output types to corresponding handlers."""
-        if 'result' in paragraph and paragraph['result']['msg']:
-            msg = paragraph['result']['msg']
-            self.output_options[paragraph['result']['type']](msg)
+    def renders_outputs(self, paragraph):
+        """Return True, as the outputs of every paragraph are rendered."""
+        return True
 
 
 class NewConverter(MarkdownConverter):
@@ -252,17 +746,17 @@ class NewConverter(MarkdownConverter):
 
     def find_message(self, msg):
         """Use regex to find encoded image."""
-        return re.search('base64,(.*?)"', msg)
+        return find_base64(msg)
+
+    def get_image_digest(self, msg, result):
+        """Return the SHA-1 of the encoded image found in msg."""
+        return payload_digest(msg, result.start(1), result.end(1))
 
     def write_image_to_disk(self, msg, result, fh):
         """Decode message to PNG and write to disk."""
-        fh.write(base64.b64decode(result.group(1).encode('utf-8')))
+        write_base64(msg, fh, result.start(1), result.end(1))
 
-    def process_results(self, paragraph):
-        """Routes Zeppelin output types to corresponding handlers."""
-        if 'editorMode' in paragraph['config']:
-            mode = paragraph['config']['editorMode'].split('/')[-1]
-            if 'results' in paragraph and paragraph['results']['msg']:
-                msg = paragraph['results']['msg'][0]
-                if mode not in ('text', 'markdown'):
-                    self.output_options[msg['type']](msg['data'])
+    def renders_outputs(self, paragraph):
+        """Return True unless the paragraph has no editor mode or is a text paragraph."""
+        mode = paragraph.editor_mode
+        return mode is not None and editor_mode(mode) not in SKIPPED_MODES
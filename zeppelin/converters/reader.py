@@ -0,0 +1,150 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import codecs
+import json
+
+
+class NotebookReader():
+    """NotebookReader incrementally parses a Zeppelin notebook file.
+
+    Paragraphs are decoded one at a time as they are iterated over, so
+    memory is bounded by the largest paragraph instead of the whole file.
+    The reader can be used in place of the loaded JSON dict: indexing it
+    with 'paragraphs' returns an iterator over the paragraphs and any other
+    top-level key returns its value.
+    """
+
+    def __init__(self, fh, chunk_size=64 * 1024):
+        """Initialize the reader on an open (text or binary) file handle."""
+        self.fh = fh
+        self.chunk_size = chunk_size
+        self.metadata = {}
+        self.complete = False
+        self._start = fh.tell() if fh.seekable() else None
+        self._started = False
+        self._decoder = json.JSONDecoder()
+
+    def __getitem__(self, key):
+        """Return paragraph iterator or the value of a top-level key."""
+        if key == 'paragraphs':
+            return self.paragraphs()
+        if key not in self.metadata and not self.complete:
+            for _ in self.paragraphs():
+                pass
+        return self.metadata[key]
+
+    def __contains__(self, key):
+        """Return True if the notebook has the given top-level key."""
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def paragraphs(self):
+        """Yield each paragraph, recording other top-level keys on the way.
+
+        Every call starts a new pass over the file, so the file handle must
+        be seekable to iterate more than once.
+        """
+        self._rewind()
+
+        self._expect('{')
+        if self._peek() == '}':
+            self.complete = True
+            return
+
+        while True:
+            key = self._value()
+            self._expect(':')
+
+            if key == 'paragraphs':
+                self._expect('[')
+                if self._peek() == ']':
+                    self._pos += 1
+                else:
+                    while True:
+                        yield self._value()
+                        if self._delimiter(',]') == ']':
+                            break
+            else:
+                self.metadata[key] = self._value()
+
+            if self._delimiter(',}') == '}':
+                break
+
+        self.complete = True
+
+    def _rewind(self):
+        """Reset the parser to the start of the notebook."""
+        if self._started:
+            if self._start is None:
+                raise ValueError('Cannot re-read notebook from a non-seekable file')
+            self.fh.seek(self._start)
+        self._started = True
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+
+    def _read(self, size):
+        """Append up to size characters from the file to the buffer."""
+        if self._pos:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+
+        chunk = self.fh.read(size)
+        if isinstance(chunk, bytes):
+            chunk = self._text_decoder.decode(chunk, final=not chunk)
+        if not chunk:
+            self._eof = True
+        self._buf += chunk
+
+    def _peek(self):
+        """Skip whitespace and return the next character without consuming it."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in ' \t\n\r':
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if self._eof:
+                raise json.JSONDecodeError('Unexpected end of file', self._buf, self._pos)
+            self._read(self.chunk_size)
+
+    def _expect(self, char):
+        """Consume the next character, which must be char."""
+        if self._peek() != char:
+            raise json.JSONDecodeError('Expecting ' + repr(char), self._buf, self._pos)
+        self._pos += 1
+
+    def _delimiter(self, chars):
+        """Consume and return the next character, which must be one of chars."""
+        char = self._peek()
+        if char not in chars:
+            raise json.JSONDecodeError('Expecting one of ' + repr(chars), self._buf, self._pos)
+        self._pos += 1
+        return char
+
+    def _value(self):
+        """Decode the next complete JSON value, reading more as needed.
+
+        The read size doubles every time a value is still incomplete so that
+        large paragraphs are re-scanned only a logarithmic number of times.
+        """
+        self._peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+                # A number at the end of the buffer may continue in the file
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._read(size)
+            size *= 2
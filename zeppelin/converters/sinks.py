@@ -0,0 +1,179 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import json
+from html import escape
+
+
+class Sink():
+    """Sink receives the content of a notebook while it is converted to Markdown.
+
+    Sinks given to a converter are fed from the same pass over the
+    paragraphs as the Markdown. Tables are passed already split into rows
+    of cells and images once they are saved, so that work is shared with
+    the Markdown output. Every method does nothing by default.
+    """
+
+    def start(self, title):
+        """Begin the notebook named title."""
+
+    def begin_paragraph(self, paragraph):
+        """Begin a Paragraph."""
+
+    def add_title(self, title):
+        """Add the title of the current paragraph."""
+
+    def add_input(self, lang, body):
+        """Add the input of the current paragraph, body being None if empty."""
+
+    def add_text(self, text):
+        """Add a text output."""
+
+    def add_table(self, rows, truncated):
+        """Add a table given as lists of cells, header first.
+
+        truncated is the number of rows left out by max_table_rows.
+        """
+
+    def add_image(self, path):
+        """Add an image saved as PNG at path, relative to the output directory."""
+
+    def end_paragraph(self, paragraph):
+        """End the current Paragraph."""
+
+    def finish(self, user, date_created, date_updated):
+        """End the notebook, given the header fields collected from its paragraphs."""
+
+
+class HTMLSink(Sink):
+    """HTMLSink writes a notebook as a standalone HTML page.
+
+    Markdown paragraphs are kept as preformatted text, as rendering them
+    would need a Markdown library.
+    """
+
+    def __init__(self, fh):
+        """Initialize with the file handle the page is written to."""
+        self.fh = fh
+
+    def write(self, line):
+        """Write a line of HTML."""
+        self.fh.write(line + '\n')
+
+    def start(self, title):
+        """Write the head of the page and the notebook title."""
+        self.write('<!DOCTYPE html>')
+        self.write('<html>')
+        self.write('<head>')
+        self.write('<meta charset="utf-8">')
+        self.write('<title>{0}</title>'.format(escape(title)))
+        self.write('</head>')
+        self.write('<body>')
+        self.write('<h1>{0}</h1>'.format(escape(title)))
+
+    def begin_paragraph(self, paragraph):
+        """Open the section of a paragraph."""
+        if paragraph.id is None:
+            self.write('<section class="paragraph">')
+        else:
+            self.write('<section class="paragraph" id="{0}">'.format(escape(str(paragraph.id))))
+
+    def add_title(self, title):
+        """Write the paragraph title as a heading."""
+        self.write('<h4>{0}</h4>'.format(escape(title)))
+
+    def add_input(self, lang, body):
+        """Write the code of the paragraph, or its Markdown source."""
+        if body is None:
+            return
+        if lang == 'md':
+            self.write('<pre class="markdown">{0}</pre>'.format(escape(body)))
+        else:
+            self.write('<pre><code class="language-{0}">{1}</code></pre>'.format(
+                escape(lang), escape(body)))
+
+    def add_text(self, text):
+        """Write a text output as preformatted text."""
+        self.write('<pre class="output">{0}</pre>'.format(escape(text)))
+
+    def add_table(self, rows, truncated):
+        """Write a table, with a note on the rows left out."""
+        self.write('<table>')
+        for index, row in enumerate(rows):
+            tag = 'th' if index == 0 else 'td'
+            self.write('<tr>' + ''.join('<{0}>{1}</{0}>'.format(tag, escape(cell))
+                                        for cell in row) + '</tr>')
+        self.write('</table>')
+        if truncated:
+            self.write('<p><em>{0} more rows truncated</em></p>'.format(truncated))
+
+    def add_image(self, path):
+        """Link an image."""
+        self.write('<img src="{0}" alt="png">'.format(escape(path)))
+
+    def end_paragraph(self, paragraph):
+        """Close the section of a paragraph."""
+        self.write('</section>')
+
+    def finish(self, user, date_created, date_updated):
+        """Write the author and dates and close the page."""
+        self.write('<footer>')
+        self.write('<p>Author(s): {0}</p>'.format(escape(user)))
+        self.write('<p>Created at: {0}</p>'.format(escape(str(date_created))))
+        self.write('<p>Updated at: {0}</p>'.format(escape(str(date_updated))))
+        self.write('</footer>')
+        self.write('</body>')
+        self.write('</html>')
+
+
+class SummarySink(Sink):
+    """SummarySink writes a JSON summary of a notebook for search indexing.
+
+    The summary holds the notebook title, author and dates, the title and
+    language of every paragraph, the languages used and the paragraphs
+    that failed with their error message.
+    """
+
+    def __init__(self, fh):
+        """Initialize with the file handle the summary is written to."""
+        self.fh = fh
+        self.title = None
+        self.paragraphs = []
+        self.errors = []
+        self.current = None
+
+    def start(self, title):
+        """Record the notebook title."""
+        self.title = title
+
+    def begin_paragraph(self, paragraph):
+        """Start the record of a paragraph."""
+        self.current = {'id': paragraph.id, 'title': paragraph.title, 'language': None}
+
+    def add_input(self, lang, body):
+        """Record the language of the paragraph."""
+        self.current['language'] = lang
+
+    def end_paragraph(self, paragraph):
+        """Keep the record of a paragraph and of its error, if it failed."""
+        self.paragraphs.append(self.current)
+        if paragraph.code == 'ERROR':
+            self.errors.append({'id': paragraph.id, 'title': paragraph.title,
+                                'message': paragraph.error})
+        self.current = None
+
+    def finish(self, user, date_created, date_updated):
+        """Write the summary as JSON."""
+        languages = sorted({paragraph['language'] for paragraph in self.paragraphs
+                            if paragraph['language'] is not None})
+        summary = {'title': self.title,
+                   'author': user,
+                   'created_at': str(date_created),
+                   'updated_at': str(date_updated),
+                   'languages': languages,
+                   'paragraphs': self.paragraphs,
+                   'errors': self.errors}
+        json.dump(summary, self.fh, indent=2, sort_keys=True)
+        self.fh.write('\n')
@@ -0,0 +1,110 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .notebook_executor import NotebookExecutor, create_session
+from ..stats import timer
+
+
+class AsyncNotebookExecutor():
+    """AsyncNotebookExecutor executes many Zeppelin notebooks at once.
+
+    Every notebook is submitted and polled concurrently on one event loop,
+    with at most max_jobs notebooks running on the server at a time. HTTP
+    requests are made from a thread pool over a shared connection pool.
+    """
+
+    def __init__(self, zeppelin_url, max_jobs=4, **options):
+        """Initialize with the options passed on to each NotebookExecutor."""
+        self.zeppelin_url = zeppelin_url
+        self.max_jobs = max_jobs
+        self.options = options
+        if 'session' not in self.options:
+            self.options['session'] = create_session(
+                max(self.options.pop('pool_size', 10), max_jobs),
+                self.options.pop('max_retries', 3))
+
+    def execute_notebooks(self, notebooks):
+        """Execute every (path, output_path) pair and report the results.
+
+        Returns a list of (path, errors, elapsed seconds), one per notebook,
+        where errors is empty if the notebook succeeded.
+        """
+        start = time.time()
+        loop = asyncio.new_event_loop()
+        try:
+            results = loop.run_until_complete(self.run_all(loop, notebooks))
+        finally:
+            loop.close()
+
+        for path, errors, elapsed in results:
+            if errors:
+                print('ERROR: {0} ({1:.1f}s)'.format(path, elapsed), file=sys.stderr)
+                [print(e.strip() + '\n', file=sys.stderr) for e in errors if e]
+            else:
+                print('OK: {0} ({1:.1f}s)'.format(path, elapsed), file=sys.stderr)
+
+        succeeded = sum(1 for path, errors, elapsed in results if not errors)
+        print('Executed {0}/{1} notebooks successfully in {2:.1f}s'.format(
+              succeeded, len(results), time.time() - start), file=sys.stderr)
+        return results
+
+    async def run_all(self, loop, notebooks):
+        """Run every notebook, keeping at most max_jobs in flight."""
+        semaphore = asyncio.Semaphore(self.max_jobs)
+        with ThreadPoolExecutor(max_workers=self.max_jobs) as pool:
+            return await asyncio.gather(*[
+                self.run_notebook(loop, pool, semaphore, path, output_path)
+                for path, output_path in notebooks])
+
+    async def run_notebook(self, loop, pool, semaphore, path, output_path):
+        """Create, run and collect a single notebook."""
+        async with semaphore:
+            start = time.time()
+            executor = NotebookExecutor(os.path.basename(path), output_path,
+                                        self.zeppelin_url, **self.options)
+            try:
+                with open(path, 'rb') as notebook:
+                    data = json.load(notebook)
+
+                await loop.run_in_executor(pool, executor.prepare_notebook, data)
+                try:
+                    await loop.run_in_executor(pool, executor.run, data)
+                    if executor.selected_ids != []:
+                        await self.wait_for_notebook(loop, pool, executor)
+                    body = await loop.run_in_executor(pool, executor.get_executed_notebook)
+                finally:
+                    await loop.run_in_executor(pool, executor.clean_up)
+
+                errors = executor.finish(data, body)
+
+            # The executor reports fatal errors with sys.exit
+            except (Exception, SystemExit) as err:
+                errors = ['{0}: {1}'.format(type(err).__name__, err)]
+
+            return path, errors, time.time() - start
+
+    async def wait_for_notebook(self, loop, pool, executor):
+        """Poll the notebook of executor until it finishes, sleeping on the event loop.
+
+        Notebooks subscribed to over the WebSocket are followed on a pool
+        thread instead, as reading the socket blocks.
+        """
+        if executor.websocket is not None:
+            await loop.run_in_executor(pool, executor.wait_for_notebook_to_execute)
+            return
+
+        intervals, deadline = executor.start_polling()
+        with timer(executor.stats, 'wait'):
+            while True:
+                finished, busy = await loop.run_in_executor(pool, executor.check_notebook_status)
+                if finished:
+                    break
+                await asyncio.sleep(executor.poll_delay(intervals, deadline, busy))
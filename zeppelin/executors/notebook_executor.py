@@ -8,58 +8,490 @@ import requests
 import sys
 import json
 import time
+import random
+import hashlib
+import threading
+import socket
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .websocket import WebSocket
+from ..converters.dates import parse_date
+from ..model import Notebook
+from ..stats import instrument
+
+
+def create_session(pool_size=10, max_retries=3):
+    """Return a session with a pool of keep-alive connections.
+
+    Connection errors, and 502/503/504 responses to idempotent requests,
+    are retried with an exponential backoff. A 500 is passed through as
+    Zeppelin uses it to signal that a notebook is busy.
+    """
+    retry = Retry(total=max_retries, backoff_factor=0.5,
+                  status_forcelist=(502, 503, 504), raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def content_hash(data):
+    """Return a short hash of the titles and texts of a notebook's paragraphs."""
+    content = [[paragraph.get('title'), paragraph.get('text')]
+               for paragraph in data.get('paragraphs', [])]
+    return hashlib.sha1(json.dumps(content).encode('utf-8')).hexdigest()[:12]
+
+
+def paragraph_key(paragraph, index):
+    """Return the key of a paragraph in the state file: its id, or its index."""
+    return paragraph.get('id', str(index))
+
+
+def text_hash(paragraph):
+    """Return a hash of a paragraph's text."""
+    return hashlib.sha1((paragraph.get('text') or '').encode('utf-8')).hexdigest()
+
+
+def poll_intervals(initial, maximum, backoff, jitter):
+    """Yield the delays between status polls.
+
+    Delays start at initial seconds and are multiplied by backoff after
+    every poll up to maximum. Each delay is randomly spread by +/- jitter
+    (a fraction of the delay) so concurrent clients do not poll in step.
+    """
+    interval = initial
+    while True:
+        yield interval * random.uniform(1 - jitter, 1 + jitter)
+        interval = min(interval * backoff, maximum)
+
+
+# Serializes updates of a state file shared by concurrent executions
+STATE_LOCK = threading.Lock()
 
 
 class NotebookExecutor():
     """NotebookExecutor is a command line tool to execute a Zeppelin notebook."""
 
-    def __init__(self, notebook_name, output_path, zeppelin_url):
-        """Initialize class object with attributes based on CLI inputs."""
+    def __init__(self, notebook_name, output_path, zeppelin_url, session=None,
+                 timeout=30, pool_size=10, max_retries=3, poll_interval=0.5,
+                 poll_max_interval=30, poll_backoff=2, poll_jitter=0.1, deadline=None,
+                 wait_mode='poll', websocket_url=None, on_paragraph=None, fail_fast=False,
+                 reuse=None, cleanup=False, paragraphs=None, state_file=None,
+                 downstream=False, stats=None):
+        """Initialize class object with attributes based on CLI inputs.
+
+        All requests go through session, which defaults to a pooled session
+        from create_session(pool_size, max_retries). Each request times out
+        after timeout seconds.
+
+        The notebook status is polled after poll_interval seconds, backing
+        off by a factor of poll_backoff up to poll_max_interval (see
+        poll_intervals). If deadline is set, execution is abandoned after
+        that many seconds.
+
+        With wait_mode 'websocket', paragraph updates pushed by Zeppelin on
+        websocket_url (ws://<zeppelin_url>/ws by default) are followed
+        instead, falling back to polling if the socket fails.
+
+        If on_paragraph is given, it is called with each paragraph as soon
+        as it finishes. With fail_fast, the job is stopped at the first
+        paragraph that fails.
+
+        With reuse 'name', an existing notebook with the same name is updated
+        in place instead of uploading a new one; only the paragraphs that
+        changed are sent. With reuse 'hash', a notebook previously created
+        from the same content is run as is. With cleanup, notebooks created
+        by the executor are deleted once the results are collected.
+
+        paragraphs selects the paragraphs to run, as a list of paragraph
+        ids, indexes or 'start:end' index ranges. With a state_file, the
+        paragraphs whose text changed since their last successful run are
+        selected too. With downstream, every paragraph after the first
+        selected one is run as well.
+
+        Giving a Stats collects the time spent in each phase, the number of
+        status checks and busy responses, and the status, run time and
+        result size of every paragraph run.
+        """
         self.notebook_name = notebook_name
         self.output_path = output_path
         self.zeppelin_url = zeppelin_url
+        self.timeout = timeout
+        self.session = session or create_session(pool_size, max_retries)
+        self.poll_interval = poll_interval
+        self.poll_max_interval = poll_max_interval
+        self.poll_backoff = poll_backoff
+        self.poll_jitter = poll_jitter
+        self.deadline = deadline
+        self.wait_mode = wait_mode
+        self.websocket_url = websocket_url or 'ws://{0}/ws'.format(zeppelin_url)
+        self.websocket = None
+        self.paragraph_ids = []
+        self.on_paragraph = on_paragraph
+        self.fail_fast = fail_fast
+        self.completed = set()
+        self.aborted = False
+        self.reuse = reuse
+        self.cleanup = cleanup
+        self.created = False
+        self.paragraphs = paragraphs
+        self.state_file = state_file
+        self.downstream = downstream
+        self.selected_ids = None
+        self.stats = stats
+
+        if stats is not None:
+            instrument(self, stats, {'prepare_notebook': 'prepare',
+                                     'start_notebook': 'start',
+                                     'wait_for_notebook_to_execute': 'wait',
+                                     'get_executed_notebook': 'fetch',
+                                     'clean_up': 'cleanup',
+                                     'write_output': 'save'})
 
     def create_notebook(self, data):
         """Create notebook under notebook directory."""
-        r = requests.post('http://{0}/api/notebook'.format(self.zeppelin_url),
-                          json=data)
+        r = self.session.post('http://{0}/api/notebook'.format(self.zeppelin_url),
+                              json=data, timeout=self.timeout)
         self.notebook_id = r.json()['body']
+        self.created = True
+
+    def prepare_notebook(self, data):
+        """Create the notebook, or find and update it when reusing notebooks."""
+        if self.reuse == 'hash':
+            data = dict(data, name='{0} [{1}]'.format(data.get('name', self.notebook_name),
+                                                      content_hash(data)))
+
+        if self.reuse:
+            self.notebook_id = self.find_notebook(data.get('name'))
+            if self.notebook_id is not None:
+                if self.reuse == 'name':
+                    self.update_notebook(data)
+                return
+
+        self.create_notebook(data)
+
+    def find_notebook(self, name):
+        """Return the id of the notebook called name, or None."""
+        r = self.session.get('http://{0}/api/notebook'.format(self.zeppelin_url),
+                             timeout=self.timeout)
+        for notebook in r.json()['body']:
+            if notebook.get('name') == name:
+                return notebook['id']
+        return None
+
+    def update_notebook(self, data):
+        """Make the notebook's paragraphs match data, sending only changes."""
+        url = 'http://{0}/api/notebook/{1}/paragraph'.format(
+              self.zeppelin_url, self.notebook_id)
+        remote = self.get_executed_notebook()['paragraphs']
+        local = data.get('paragraphs', [])
+
+        for index, paragraph in enumerate(local):
+            content = {'title': paragraph.get('title'), 'text': paragraph.get('text')}
+            if index >= len(remote):
+                self.session.post(url, json=dict(content, index=index), timeout=self.timeout)
+            elif content != {'title': remote[index].get('title'),
+                             'text': remote[index].get('text')}:
+                self.session.put('{0}/{1}'.format(url, remote[index]['id']), json=content,
+                                 timeout=self.timeout)
+
+        for paragraph in reversed(remote[len(local):]):
+            self.session.delete('{0}/{1}'.format(url, paragraph['id']), timeout=self.timeout)
+
+    def delete_notebook(self):
+        """Delete the notebook from Zeppelin."""
+        self.session.delete('http://{0}/api/notebook/{1}'.format(
+                            self.zeppelin_url, self.notebook_id), timeout=self.timeout)
 
     def run_notebook(self):
         """Call API to execute notebook."""
-        requests.post('http://{0}/api/notebook/job/{1}'.format(
-                      self.zeppelin_url, self.notebook_id))
+        self.session.post('http://{0}/api/notebook/job/{1}'.format(
+                          self.zeppelin_url, self.notebook_id), timeout=self.timeout)
+
+    def run_paragraph(self, paragraph_id):
+        """Call API to execute a single paragraph."""
+        self.session.post('http://{0}/api/notebook/job/{1}/{2}'.format(
+                          self.zeppelin_url, self.notebook_id, paragraph_id),
+                          timeout=self.timeout)
+
+    def start_notebook(self, data):
+        """Run the whole notebook, or only the selected paragraphs in order."""
+        if self.paragraphs is None and self.state_file is None:
+            self.run_notebook()
+            return
+
+        remote = self.get_executed_notebook()['paragraphs']
+        indexes = self.select_paragraphs(data.get('paragraphs', []))
+        self.selected_ids = [remote[index]['id'] for index in indexes if index < len(remote)]
+        if not self.selected_ids:
+            print('No paragraphs to run.', file=sys.stderr)
+
+        for paragraph_id in self.selected_ids:
+            self.run_paragraph(paragraph_id)
+
+    def select_paragraphs(self, paragraphs):
+        """Return the sorted indexes of the paragraphs to run."""
+        selected = set()
+        ids = [paragraph.get('id') for paragraph in paragraphs]
+
+        for spec in self.paragraphs or []:
+            start, colon, end = spec.partition(':')
+            if colon and (start + end).isdigit() or spec == ':':
+                start = int(start) if start else 0
+                end = int(end) if end else len(paragraphs)
+                selected.update(range(start, min(end, len(paragraphs))))
+            elif spec.isdigit():
+                selected.add(int(spec))
+            elif spec in ids:
+                selected.add(ids.index(spec))
+            else:
+                print('ERROR: Unknown paragraph: {0}'.format(spec), file=sys.stderr)
+                sys.exit(1)
+
+        if self.state_file is not None:
+            state = self.load_state()
+            for index, paragraph in enumerate(paragraphs):
+                if state.get(paragraph_key(paragraph, index)) != text_hash(paragraph):
+                    selected.add(index)
+
+        if self.downstream and selected:
+            selected.update(range(min(selected), len(paragraphs)))
+
+        return sorted(index for index in selected if index < len(paragraphs))
+
+    def load_state(self):
+        """Return this notebook's paragraph text hashes from the last run."""
+        try:
+            with open(self.state_file) as fh:
+                return json.load(fh).get(self.notebook_name, {})
+        except (OSError, ValueError):
+            return {}
+
+    def save_state(self, data, body):
+        """Record the text hashes of the paragraphs that just ran successfully."""
+        with STATE_LOCK:
+            try:
+                with open(self.state_file) as fh:
+                    states = json.load(fh)
+            except (OSError, ValueError):
+                states = {}
+
+            state = states.setdefault(self.notebook_name, {})
+            executed = zip(data.get('paragraphs', []), body['paragraphs'])
+            for index, (paragraph, result) in enumerate(executed):
+                ran = self.selected_ids is None or result['id'] in self.selected_ids
+                if ran and result.get('status') == 'FINISHED':
+                    state[paragraph_key(paragraph, index)] = text_hash(paragraph)
+
+            with open(self.state_file, 'w') as fh:
+                json.dump(states, fh, indent=2)
+
+    def subscribe_to_notebook(self):
+        """Open a WebSocket to Zeppelin and subscribe to the notebook's events.
+
+        Must be called before the notebook is run so no update is missed. If
+        the socket can't be used, the notebook is polled instead.
+        """
+        try:
+            self.websocket = WebSocket(self.websocket_url, self.timeout)
+            self.websocket.send(json.dumps({'op': 'GET_NOTE',
+                                            'data': {'id': self.notebook_id},
+                                            'principal': 'anonymous',
+                                            'ticket': 'anonymous',
+                                            'roles': '[]'}))
+            while True:
+                message = json.loads(self.websocket.recv())
+                if message.get('op') == 'NOTE':
+                    paragraphs = message['data']['note']['paragraphs']
+                    self.paragraph_ids = [paragraph['id'] for paragraph in paragraphs]
+                    return
+        except (OSError, ValueError, KeyError) as err:
+            print('WebSocket unavailable ({0}), polling instead.'.format(err), file=sys.stderr)
+            self.close_websocket()
+
+    def close_websocket(self):
+        """Close the WebSocket if it is open."""
+        if self.websocket is not None:
+            self.websocket.close()
+            self.websocket = None
 
     def wait_for_notebook_to_execute(self):
-        """Wait for notebook to finish executing before continuing."""
+        """Wait for notebook to finish executing before continuing.
+
+        The deadline runs from the start of the wait, also when falling back
+        from the WebSocket to polling.
+        """
+        intervals, deadline = self.start_polling()
+        if self.websocket is not None:
+            try:
+                self.wait_for_notebook_events(intervals, deadline)
+                return
+            except (OSError, ValueError, KeyError) as err:
+                print('WebSocket failed ({0}), polling instead.'.format(err), file=sys.stderr)
+            finally:
+                self.close_websocket()
+
         while True:
-            r = requests.get('http://{0}/api/notebook/job/{1}'.format(
-                             self.zeppelin_url, self.notebook_id))
+            finished, busy = self.check_notebook_status()
+            if finished:
+                break
+            time.sleep(self.poll_delay(intervals, deadline, busy))
 
-            if r.status_code == 200:
-                try:
-                    data = r.json()['body']
-                    if all(paragraph['status'] in ['FINISHED', 'ERROR'] for paragraph in data):
-                        break
-                    time.sleep(5)
-                    continue
-                except KeyError as e:
-                    print(e)
-                    print(r.json())
+    def wait_for_notebook_events(self, intervals, deadline):
+        """Wait for the notebook by following paragraph updates on the WebSocket.
+
+        Once every paragraph is reported FINISHED or ERROR, this is confirmed
+        with a single status poll. If no update arrives for a whole poll
+        interval, the status is polled as well. intervals and deadline are
+        as returned by start_polling().
+        """
+        delay = next(intervals)
+        statuses = {}
+
+        while True:
+            if deadline is not None and time.monotonic() > deadline:
+                print('ERROR: Notebook did not finish executing within {} seconds.'.format(
+                      self.deadline), file=sys.stderr)
+                sys.exit(1)
 
-            elif r.status_code == 500:
-                print('Notebook is still busy executing. Checking again in 60 seconds...')
-                time.sleep(60)
+            self.websocket.settimeout(delay)
+            try:
+                message = json.loads(self.websocket.recv())
+            except socket.timeout:
+                finished, busy = self.check_notebook_status()
+                if finished:
+                    return
+                delay = self.poll_delay(intervals, deadline, busy)
                 continue
 
-            else:
-                print('ERROR: Unexpected return code: {}'.format(r.status_code))
+            if message.get('op') != 'PARAGRAPH':
+                continue
+
+            paragraph = message['data']['paragraph']
+            paragraph_ids = self.paragraph_ids
+            if self.selected_ids is not None:
+                if paragraph['id'] not in self.selected_ids:
+                    continue
+                paragraph_ids = self.selected_ids
+
+            statuses[paragraph['id']] = paragraph['status']
+            if paragraph['status'] in ['FINISHED', 'ERROR']:
+                self.paragraph_completed(paragraph['id'], paragraph['status'], paragraph)
+            if self.aborted:
+                return
+            if all(statuses.get(paragraph_id) in ['FINISHED', 'ERROR']
+                   for paragraph_id in paragraph_ids):
+                finished, busy = self.check_notebook_status()
+                if finished:
+                    return
+
+    def start_polling(self):
+        """Return the poll intervals and the absolute deadline (or None)."""
+        intervals = poll_intervals(self.poll_interval, self.poll_max_interval,
+                                   self.poll_backoff, self.poll_jitter)
+        deadline = None
+        if self.deadline is not None:
+            deadline = time.monotonic() + self.deadline
+        return intervals, deadline
+
+    def check_notebook_status(self):
+        """Poll the notebook job once, returning (finished, busy)."""
+        r = self.session.get('http://{0}/api/notebook/job/{1}'.format(
+                             self.zeppelin_url, self.notebook_id), timeout=self.timeout)
+        if self.stats is not None:
+            self.stats.count('status_checks')
+            if r.status_code == 500:
+                self.stats.count('busy_responses')
+
+        if r.status_code == 200:
+            try:
+                data = r.json()['body']
+                if self.selected_ids is not None:
+                    data = [paragraph for paragraph in data
+                            if paragraph['id'] in self.selected_ids]
+                for paragraph in data:
+                    if paragraph['status'] in ['FINISHED', 'ERROR']:
+                        self.paragraph_completed(paragraph['id'], paragraph['status'])
+                if self.aborted:
+                    return True, False
+                if all(paragraph['status'] in ['FINISHED', 'ERROR'] for paragraph in data):
+                    return True, False
+            except KeyError as e:
+                print(e)
+                print(r.json())
+            return False, False
+
+        elif r.status_code == 500:
+            return False, True
+
+        else:
+            print('ERROR: Unexpected return code: {}'.format(r.status_code))
+            sys.exit(1)
+
+    def paragraph_completed(self, paragraph_id, status, paragraph=None):
+        """Handle a paragraph that just finished, once per paragraph.
+
+        The paragraph is passed to on_paragraph, fetching it first unless it
+        is given. With fail_fast, an ERROR stops the rest of the job.
+        """
+        if paragraph_id in self.completed:
+            return
+        self.completed.add(paragraph_id)
+
+        if self.on_paragraph is not None:
+            if paragraph is None:
+                paragraph = self.get_paragraph(paragraph_id)
+            self.on_paragraph(paragraph)
+
+        if self.fail_fast and status == 'ERROR' and not self.aborted:
+            self.stop_notebook()
+            self.aborted = True
+
+    def get_paragraph(self, paragraph_id):
+        """Return a single paragraph of the notebook."""
+        r = self.session.get('http://{0}/api/notebook/{1}/paragraph/{2}'.format(
+                             self.zeppelin_url, self.notebook_id, paragraph_id),
+                             timeout=self.timeout)
+        if r.status_code == 200:
+            return r.json()['body']
+        else:
+            print('ERROR: Could not get paragraph {0}.'.format(paragraph_id), file=sys.stderr)
+            sys.exit(1)
+
+    def stop_notebook(self):
+        """Call API to stop the remaining paragraphs of the notebook."""
+        print('Paragraph failed, stopping notebook.', file=sys.stderr)
+        self.session.delete('http://{0}/api/notebook/job/{1}'.format(
+                            self.zeppelin_url, self.notebook_id), timeout=self.timeout)
+
+    def poll_delay(self, intervals, deadline, busy):
+        """Return the delay before the next status check.
+
+        The last delay is shortened to end at the deadline, so the notebook
+        is checked once more then. Exits once the deadline has passed.
+        """
+        delay = next(intervals)
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print('ERROR: Notebook did not finish executing within {} seconds.'.format(
+                      self.deadline), file=sys.stderr)
                 sys.exit(1)
+            delay = min(delay, remaining)
+
+        if busy:
+            if self.stats is not None:
+                self.stats.add_time('busy_wait', delay)
+            print('Notebook is still busy executing. '
+                  'Checking again in {0:.1f} seconds...'.format(delay))
+        return delay
 
     def get_executed_notebook(self):
         """Return the executed notebook."""
-        r = requests.get('http://{0}/api/notebook/{1}'.format(
-                         self.zeppelin_url, self.notebook_id))
+        r = self.session.get('http://{0}/api/notebook/{1}'.format(
+                             self.zeppelin_url, self.notebook_id), timeout=self.timeout)
         if r.status_code == 200:
             return r.json()['body']
         else:
@@ -86,27 +518,87 @@ class NotebookExecutor():
         If any errors occur from executing the notebook's paragraphs, they will
         be displayed in stderr.
         """
-        self.create_notebook(data)
-        self.run_notebook()
-        self.wait_for_notebook_to_execute()
-        body = self.get_executed_notebook()
-
-        err = False
-        output = []
-        for paragraph in body['paragraphs']:
-            if 'results' in paragraph and paragraph['results']['code'] == 'ERROR':
-                output.append(paragraph['results']['msg'][0]['data'])
-                err = True
-
-            elif 'result' in paragraph and paragraph['result']['code'] == 'ERROR':
-                output.append(paragraph['result']['msg'])
-                err = True
+        self.prepare_notebook(data)
+        try:
+            self.run(data)
+            if self.selected_ids != []:
+                self.wait_for_notebook_to_execute()
+            body = self.get_executed_notebook()
+        finally:
+            self.clean_up()
 
+        output = self.finish(data, body)
         [print(e.strip() + '\n', file=sys.stderr) for e in output if e]
 
-        if err:
+        if output:
             sys.exit(1)
 
+    def run(self, data):
+        """Start the prepared notebook, subscribing to its updates first if needed."""
+        if self.wait_mode == 'websocket':
+            self.subscribe_to_notebook()
+        self.start_notebook(data)
+
+    def finish(self, data, body):
+        """Record the executed notebook body and return the errors of its paragraphs.
+
+        The stats and the state file are updated, and the notebook is only
+        written out if no paragraph failed.
+        """
+        if self.stats is not None:
+            self.record_paragraphs(body)
+
+        if self.state_file is not None:
+            self.save_state(data, body)
+
+        output = self.collect_errors(body)
+        if not output:
+            self.write_output(body)
+        return output
+
+    def record_paragraphs(self, body):
+        """Add the status, run time and result size of each paragraph run to the stats."""
+        for index, paragraph in enumerate(Notebook(body).paragraphs):
+            if self.selected_ids is not None and paragraph.id not in self.selected_ids:
+                continue
+
+            seconds = None
+            if paragraph.date_started and paragraph.date_finished:
+                try:
+                    started = parse_date(paragraph.date_started)
+                    seconds = (parse_date(paragraph.date_finished) - started).total_seconds()
+                except (ValueError, OverflowError):
+                    pass
+
+            results = paragraph.results
+            self.stats.add_paragraph(notebook=self.notebook_name, index=index,
+                                     id=paragraph.id, status=paragraph.status,
+                                     seconds=seconds,
+                                     result_chars=len(json.dumps(results)) if results else 0)
+
+    def clean_up(self):
+        """Delete the notebook if it was created by this run and cleanup is on."""
+        if self.cleanup and self.created:
+            self.delete_notebook()
+            self.created = False
+
+    def collect_errors(self, body):
+        """Return the error output of every paragraph run that failed.
+
+        Paragraphs left out by the selection keep the results of an earlier
+        run, so their errors are not reported.
+        """
+        output = []
+        for paragraph in Notebook(body).paragraphs:
+            if self.selected_ids is not None and paragraph.id not in self.selected_ids:
+                continue
+            if paragraph.code == 'ERROR':
+                output.append(paragraph.error)
+
+        return output
+
+    def write_output(self, body):
+        """Print the executed notebook, or save it if an output path is given."""
         if not self.output_path:
             print(json.dumps(body, indent=2))
         else:
@@ -0,0 +1,175 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import os
+import base64
+import hashlib
+import socket
+import struct
+from urllib.parse import urlparse
+
+# Appended to the client key to compute Sec-WebSocket-Accept (RFC 6455)
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+def accept_key(key):
+    """Return the Sec-WebSocket-Accept value for a Sec-WebSocket-Key."""
+    digest = hashlib.sha1((key + WEBSOCKET_GUID).encode('ascii')).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+def encode_frame(opcode, payload, mask=True):
+    """Encode a single final frame. Clients must mask, servers must not."""
+    header = bytearray([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    length = len(payload)
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 1 << 16:
+        header.append(mask_bit | 126)
+        header += struct.pack('!H', length)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack('!Q', length)
+
+    if mask:
+        key = os.urandom(4)
+        header += key
+        payload = bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+
+    return bytes(header) + payload
+
+
+def frame_size(data):
+    """Return the size of the first frame in data, or None if still unknown."""
+    if len(data) < 2:
+        return None
+    length = data[1] & 0x7F
+    offset = 2
+    if length == 126:
+        offset = 4
+    elif length == 127:
+        offset = 10
+    if len(data) < offset:
+        return None
+    if offset == 4:
+        length, = struct.unpack('!H', data[2:4])
+    elif offset == 10:
+        length, = struct.unpack('!Q', data[2:10])
+    return offset + (4 if data[1] & 0x80 else 0) + length
+
+
+def read_frame(read):
+    """Read a frame with read(n), returning (fin, opcode, payload)."""
+    first, second = read(2)
+    length = second & 0x7F
+    if length == 126:
+        length, = struct.unpack('!H', read(2))
+    elif length == 127:
+        length, = struct.unpack('!Q', read(8))
+
+    key = read(4) if second & 0x80 else None
+    payload = read(length)
+    if key:
+        payload = bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+
+    return bool(first & 0x80), first & 0x0F, payload
+
+
+class WebSocket():
+    """WebSocket is a minimal RFC 6455 client for Zeppelin's event stream.
+
+    It only supports what following notebook events needs: unencrypted
+    connections, text messages (possibly fragmented), pings and close.
+    """
+
+    def __init__(self, url, timeout=30):
+        """Connect to url (ws://host:port/path) and perform the handshake."""
+        parsed = urlparse(url)
+        self.sock = socket.create_connection((parsed.hostname, parsed.port or 80), timeout)
+        self.buffer = b''
+        self.message = b''
+
+        key = base64.b64encode(os.urandom(16)).decode('ascii')
+        request = ['GET {0} HTTP/1.1'.format(parsed.path or '/'),
+                   'Host: ' + parsed.netloc,
+                   'Upgrade: websocket',
+                   'Connection: Upgrade',
+                   'Sec-WebSocket-Key: ' + key,
+                   'Sec-WebSocket-Version: 13']
+        self.sock.sendall(('\r\n'.join(request) + '\r\n\r\n').encode('ascii'))
+
+        while b'\r\n\r\n' not in self.buffer:
+            self.buffer += self.recv_bytes()
+        response, self.buffer = self.buffer.split(b'\r\n\r\n', 1)
+
+        lines = response.decode('latin-1').split('\r\n')
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(': ')
+            headers[name.lower()] = value
+        if lines[0].split()[1:2] != ['101'] or \
+                headers.get('sec-websocket-accept') != accept_key(key):
+            self.sock.close()
+            raise ConnectionError('WebSocket handshake failed: ' + lines[0])
+
+    def settimeout(self, timeout):
+        """Set the timeout of blocking reads in seconds."""
+        self.sock.settimeout(timeout)
+
+    def recv_bytes(self):
+        """Read whatever is available from the socket."""
+        data = self.sock.recv(65536)
+        if not data:
+            raise ConnectionError('WebSocket connection closed')
+        return data
+
+    def read(self, n):
+        """Read exactly n bytes."""
+        while len(self.buffer) < n:
+            self.buffer += self.recv_bytes()
+        data, self.buffer = self.buffer[:n], self.buffer[n:]
+        return data
+
+    def send(self, text):
+        """Send a text message."""
+        self.sock.sendall(encode_frame(OP_TEXT, text.encode('utf-8')))
+
+    def recv(self):
+        """Return the next text message, answering pings on the way.
+
+        A frame is only consumed once it has been received in full, so a
+        read that times out can safely be retried.
+        """
+        while True:
+            size = frame_size(self.buffer)
+            if size is None or len(self.buffer) < size:
+                self.buffer += self.recv_bytes()
+                continue
+
+            fin, opcode, payload = read_frame(self.read)
+            if opcode == OP_PING:
+                self.sock.sendall(encode_frame(OP_PONG, payload))
+            elif opcode == OP_CLOSE:
+                raise ConnectionError('WebSocket connection closed')
+            elif opcode in (OP_TEXT, OP_CONTINUATION):
+                self.message += payload
+                if fin:
+                    message, self.message = self.message, b''
+                    return message.decode('utf-8')
+
+    def close(self):
+        """Close the connection."""
+        try:
+            self.sock.sendall(encode_frame(OP_CLOSE, b''))
+        except OSError:
+            pass
+        self.sock.close()
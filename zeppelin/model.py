@@ -0,0 +1,124 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+class Notebook():
+    """Notebook wraps a Zeppelin notebook, loaded or read by a NotebookReader.
+
+    Paragraphs are wrapped as they are iterated over, so a NotebookReader
+    still only holds one paragraph in memory at a time.
+    """
+
+    __slots__ = ('raw',)
+
+    def __init__(self, raw):
+        """Initialize with the notebook JSON dict or a NotebookReader."""
+        self.raw = raw
+
+    @property
+    def name(self):
+        """Return the name of the notebook."""
+        return self.raw['name']
+
+    @property
+    def paragraphs(self):
+        """Return an iterator over the paragraphs of the notebook."""
+        return (Paragraph(paragraph) for paragraph in self.raw['paragraphs'])
+
+    @property
+    def version(self):
+        """Return the Zeppelin version of the notebook layout, from its first paragraph.
+
+        Notebooks without paragraphs, e.g. freshly created ones, are taken
+        to use the current 0.7.x layout.
+        """
+        for paragraph in self.paragraphs:
+            return paragraph.version
+        return '0.7.1'
+
+
+class Paragraph():
+    """Paragraph gives the fields of a 0.6.2 or 0.7.x paragraph a common layout.
+
+    The outputs are only gathered from the results when asked for, and the
+    output data is passed on as is, so paragraphs whose results are never
+    rendered cost no more than the decoded JSON itself.
+    """
+
+    __slots__ = ('raw', 'id', 'title', 'text', 'user', 'date_created', 'date_updated',
+                 'editor_mode', 'result_key')
+
+    def __init__(self, raw):
+        """Initialize with the paragraph JSON dict."""
+        get = raw.get
+        self.raw = raw
+        self.id = get('id')
+        self.title = get('title')
+        self.text = get('text')
+        self.user = get('user')
+        self.date_created = get('dateCreated')
+        self.date_updated = get('dateUpdated')
+        config = get('config')
+        self.editor_mode = config.get('editorMode') if config else None
+        if 'results' in raw:
+            self.result_key = 'results'
+        elif 'result' in raw:
+            self.result_key = 'result'
+        else:
+            self.result_key = None
+
+    @property
+    def status(self):
+        """Return the run status, e.g. 'FINISHED' or 'ERROR', or None."""
+        return self.raw.get('status')
+
+    @property
+    def date_started(self):
+        """Return the date the last run started, or None."""
+        return self.raw.get('dateStarted')
+
+    @property
+    def date_finished(self):
+        """Return the date the last run finished, or None."""
+        return self.raw.get('dateFinished')
+
+    @property
+    def version(self):
+        """Return the Zeppelin version of the paragraph layout."""
+        return '0.7.1' if 'results' in self.raw else '0.6.2'
+
+    @property
+    def results(self):
+        """Return the results as stored in the notebook, or None."""
+        if self.result_key is None:
+            return None
+        return self.raw[self.result_key]
+
+    @property
+    def code(self):
+        """Return the result code, e.g. 'SUCCESS' or 'ERROR', or None."""
+        results = self.results
+        return results.get('code') if results else None
+
+    @property
+    def outputs(self):
+        """Return the (type, data) of every output of the paragraph, in order.
+
+        The list is built from the results on every access, so it is not
+        kept alive with the paragraph.
+        """
+        results = self.results
+        if not results or not results.get('msg'):
+            return []
+        if self.result_key == 'results':
+            return [(msg.get('type'), msg['data']) for msg in results['msg']]
+        return [(results.get('type'), results['msg'])]
+
+    @property
+    def error(self):
+        """Return the data of the first output if the paragraph failed, or None."""
+        if self.code != 'ERROR':
+            return None
+        outputs = self.outputs
+        return outputs[0][1] if outputs else None
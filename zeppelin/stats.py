@@ -0,0 +1,150 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import sys
+import json
+import time
+import functools
+import importlib
+import threading
+
+
+class Stats():
+    """Stats collects phase timings, counters and per-paragraph records.
+
+    Converters and executors given a Stats time their phases with timer(),
+    count events with count() and describe every paragraph they handle with
+    add_paragraph(). Each of those is also passed to the hooks as an event
+    dict, e.g. {'type': 'phase', 'name': 'tables', 'seconds': 0.01}, so they
+    can be forwarded to a metrics system as they happen.
+
+    Phases may run in several threads at once and nest, so their times can
+    add up to more than the wall clock time.
+    """
+
+    def __init__(self, hooks=None):
+        """Initialize with a list of functions called with every event."""
+        self.phases = {}
+        self.counters = {}
+        self.paragraphs = []
+        self.hooks = list(hooks or [])
+        self.lock = threading.Lock()
+
+    def timer(self, name):
+        """Return a context manager adding its run time to the phase name."""
+        return Timer(self, name)
+
+    def add_time(self, name, seconds):
+        """Add seconds to the phase name."""
+        with self.lock:
+            phase = self.phases.setdefault(name, {'count': 0, 'seconds': 0.0})
+            phase['count'] += 1
+            phase['seconds'] += seconds
+        self.emit({'type': 'phase', 'name': name, 'seconds': seconds})
+
+    def count(self, name, value=1):
+        """Add value to the counter name."""
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        self.emit({'type': 'count', 'name': name, 'value': value})
+
+    def add_paragraph(self, **record):
+        """Record the duration, size and other details of a paragraph."""
+        with self.lock:
+            self.paragraphs.append(record)
+        self.emit(dict(record, type='paragraph'))
+
+    def emit(self, event):
+        """Pass an event to every hook."""
+        for hook in self.hooks:
+            hook(event)
+
+    def merge(self, data):
+        """Add the results of another Stats, as returned by to_dict()."""
+        for name, phase in data['phases'].items():
+            with self.lock:
+                total = self.phases.setdefault(name, {'count': 0, 'seconds': 0.0})
+                total['count'] += phase['count']
+                total['seconds'] += phase['seconds']
+            self.emit({'type': 'phase', 'name': name, 'seconds': phase['seconds']})
+        for name, value in data['counters'].items():
+            self.count(name, value)
+        for record in data['paragraphs']:
+            self.add_paragraph(**record)
+
+    def to_dict(self):
+        """Return the collected stats."""
+        with self.lock:
+            return {'phases': {name: dict(phase) for name, phase in self.phases.items()},
+                    'counters': dict(self.counters),
+                    'paragraphs': list(self.paragraphs)}
+
+    def write(self, fh):
+        """Write the collected stats to fh as JSON."""
+        fh.write(json.dumps(self.to_dict(), indent=2, sort_keys=True, default=str) + '\n')
+
+
+class Timer():
+    """Timer adds the time spent in a with block to a phase of a Stats."""
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.add_time(self.name, time.perf_counter() - self.start)
+
+
+class NullTimer():
+    """NullTimer stands in for a Timer when no stats are collected."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+def timer(stats, name):
+    """Return stats.timer(name), or a timer doing nothing if stats is None."""
+    if stats is None:
+        return NULL_TIMER
+    return stats.timer(name)
+
+
+def instrument(obj, stats, phases):
+    """Time the methods of obj named in phases, a dict of method name to phase name.
+
+    The methods are only wrapped on obj itself, so objects created without
+    stats run at full speed.
+    """
+    for method_name, phase in phases.items():
+        setattr(obj, method_name, timed(stats, phase, getattr(obj, method_name)))
+
+
+def timed(stats, name, function):
+    """Return function adding its run time to the phase name of stats."""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with stats.timer(name):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+def load_hook(spec):
+    """Return the function named by a 'module:function' spec."""
+    module, _, name = spec.partition(':')
+    try:
+        return getattr(importlib.import_module(module), name)
+    except (ImportError, AttributeError, ValueError) as err:
+        print('ERROR: Could not load stats hook {0}: {1}'.format(spec, err), file=sys.stderr)
+        sys.exit(1)
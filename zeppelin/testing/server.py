@@ -0,0 +1,391 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+# Every route of the Zeppelin REST API the executor uses
+ROUTES = [
+    ('GET', re.compile(r'/api/notebook$'), 'list_notebooks'),
+    ('POST', re.compile(r'/api/notebook$'), 'create_notebook'),
+    ('GET', re.compile(r'/api/notebook/(?P<note>[^/]+)$'), 'get_notebook'),
+    ('DELETE', re.compile(r'/api/notebook/(?P<note>[^/]+)$'), 'delete_notebook'),
+    ('GET', re.compile(r'/api/notebook/job/(?P<note>[^/]+)$'), 'get_status'),
+    ('POST', re.compile(r'/api/notebook/job/(?P<note>[^/]+)$'), 'run_notebook'),
+    ('DELETE', re.compile(r'/api/notebook/job/(?P<note>[^/]+)$'), 'stop_notebook'),
+    ('POST', re.compile(r'/api/notebook/job/(?P<note>[^/]+)/(?P<paragraph>[^/]+)$'),
+     'run_paragraph'),
+    ('POST', re.compile(r'/api/notebook/(?P<note>[^/]+)/paragraph$'), 'add_paragraph'),
+    ('GET', re.compile(r'/api/notebook/(?P<note>[^/]+)/paragraph/(?P<paragraph>[^/]+)$'),
+     'get_paragraph'),
+    ('PUT', re.compile(r'/api/notebook/(?P<note>[^/]+)/paragraph/(?P<paragraph>[^/]+)$'),
+     'update_paragraph'),
+    ('DELETE', re.compile(r'/api/notebook/(?P<note>[^/]+)/paragraph/(?P<paragraph>[^/]+)$'),
+     'delete_paragraph'),
+]
+
+DONE = ('FINISHED', 'ERROR', 'ABORT')
+
+
+def zeppelin_date(date):
+    """Format a datetime like Zeppelin does, e.g. 'Dec 17, 2016 3:32:15 PM'."""
+    return '{0:%b} {0.day}, {0.year} {1}:{0:%M}:{0:%S} {0:%p}'.format(date, date.hour % 12 or 12)
+
+
+class NotFound(Exception):
+    """Raised for unknown notebooks and paragraphs."""
+
+
+class ZeppelinState():
+    """ZeppelinState holds the notebooks of a MockZeppelin and runs their paragraphs.
+
+    Paragraphs of a notebook run one after another, each taking the
+    duration given for it, and finish with status ERROR if fail returns True
+    for them. Time is simulated from the moment a run is requested, so no
+    thread is needed to execute them.
+    """
+
+    def __init__(self, duration=0.0, fail=None, busy_responses=0):
+        """Initialize with the paragraph duration, fail function and busy responses."""
+        self.duration = duration
+        self.fail = fail
+        self.busy_responses = busy_responses
+        self.notebooks = {}
+        self.next_id = 1
+        self.lock = threading.Lock()
+
+    def new_id(self, prefix):
+        """Return a new notebook or paragraph id starting with prefix."""
+        identifier = '{0}{1}'.format(prefix, self.next_id)
+        self.next_id += 1
+        return identifier
+
+    def new_paragraph(self, content):
+        """Return a new paragraph, ready to run, from its title, text and config."""
+        return {'id': self.new_id('paragraph_'), 'title': content.get('title'),
+                'text': content.get('text'), 'status': 'READY',
+                'config': content.get('config', {})}
+
+    def notebook(self, notebook_id):
+        """Return a notebook by id, raising NotFound if there is none."""
+        try:
+            return self.notebooks[notebook_id]
+        except KeyError:
+            raise NotFound('No such notebook: ' + notebook_id)
+
+    def paragraph(self, notebook, paragraph_id):
+        """Return a paragraph of notebook by id, raising NotFound if there is none."""
+        for paragraph in notebook['paragraphs']:
+            if paragraph['id'] == paragraph_id:
+                return paragraph
+        raise NotFound('No such paragraph: ' + paragraph_id)
+
+    def paragraph_duration(self, paragraph):
+        """Return the run time in seconds of a paragraph."""
+        if callable(self.duration):
+            return self.duration(paragraph)
+        return self.duration
+
+    def update(self, notebook):
+        """Bring the status of every scheduled paragraph up to date."""
+        now = time.monotonic()
+        for paragraph in notebook['paragraphs']:
+            schedule = paragraph.get('schedule')
+            if schedule is None or paragraph['status'] in DONE:
+                continue
+            start, end = schedule
+            if now >= end:
+                failed = self.fail is not None and self.fail(paragraph)
+                paragraph['status'] = 'ERROR' if failed else 'FINISHED'
+                paragraph['results'] = {'code': 'ERROR' if failed else 'SUCCESS', 'msg': [
+                    {'type': 'TEXT', 'data': 'error' if failed else paragraph.get('text') or ''}]}
+                paragraph['dateFinished'] = zeppelin_date(
+                    datetime.now() - timedelta(seconds=now - end))
+                del paragraph['schedule']
+            elif now >= start:
+                paragraph['status'] = 'RUNNING'
+                paragraph['dateStarted'] = zeppelin_date(
+                    datetime.now() - timedelta(seconds=now - start))
+
+    def schedule(self, notebook, paragraphs):
+        """Queue paragraphs to run after the ones already scheduled."""
+        now = time.monotonic()
+        ends = [p['schedule'][1] for p in notebook['paragraphs'] if 'schedule' in p]
+        start = max(ends + [now])
+        for paragraph in paragraphs:
+            end = start + self.paragraph_duration(paragraph)
+            paragraph.update(status='PENDING', schedule=(start, end),
+                             dateStarted=zeppelin_date(
+                                 datetime.now() + timedelta(seconds=start - now)))
+            paragraph.pop('results', None)
+            paragraph.pop('dateFinished', None)
+            start = end
+
+    def view(self, paragraph):
+        """Return a paragraph as Zeppelin returns it, without its schedule."""
+        return {key: value for key, value in paragraph.items() if key != 'schedule'}
+
+    def list_notebooks(self, body):
+        """Return the id and name of every notebook."""
+        return [{'id': n['id'], 'name': n['name']} for n in self.notebooks.values()]
+
+    def create_notebook(self, body):
+        """Create a notebook with the name and paragraphs of body and return its id."""
+        notebook_id = self.new_id('NOTE')
+        self.notebooks[notebook_id] = {
+            'id': notebook_id, 'name': body.get('name', 'Untitled'), 'busy': self.busy_responses,
+            'paragraphs': [self.new_paragraph(p) for p in body.get('paragraphs', [])]}
+        return notebook_id
+
+    def get_notebook(self, body, note):
+        """Return a notebook with the current status of its paragraphs."""
+        notebook = self.notebook(note)
+        self.update(notebook)
+        return {'id': notebook['id'], 'name': notebook['name'],
+                'paragraphs': [self.view(p) for p in notebook['paragraphs']]}
+
+    def delete_notebook(self, body, note):
+        """Delete a notebook."""
+        self.notebook(note)
+        del self.notebooks[note]
+
+    def get_status(self, body, note):
+        """Return the status of every paragraph, or HTTP 500 while the notebook is busy."""
+        notebook = self.notebook(note)
+        if notebook['busy'] > 0:
+            notebook['busy'] -= 1
+            return 500, None
+        self.update(notebook)
+        return [{'id': p['id'], 'status': p['status']} for p in notebook['paragraphs']]
+
+    def run_notebook(self, body, note):
+        """Schedule every paragraph of a notebook that is not already scheduled."""
+        notebook = self.notebook(note)
+        self.update(notebook)
+        self.schedule(notebook, [p for p in notebook['paragraphs'] if 'schedule' not in p])
+
+    def stop_notebook(self, body, note):
+        """Abort every paragraph of a notebook that has not finished."""
+        notebook = self.notebook(note)
+        self.update(notebook)
+        for paragraph in notebook['paragraphs']:
+            if paragraph.pop('schedule', None) is not None:
+                paragraph['status'] = 'ABORT'
+
+    def run_paragraph(self, body, note, paragraph):
+        """Schedule a single paragraph."""
+        notebook = self.notebook(note)
+        self.update(notebook)
+        self.schedule(notebook, [self.paragraph(notebook, paragraph)])
+
+    def add_paragraph(self, body, note):
+        """Insert a paragraph at the index of body, or last, and return its id."""
+        notebook = self.notebook(note)
+        paragraph = self.new_paragraph(body)
+        index = body.get('index', len(notebook['paragraphs']))
+        notebook['paragraphs'].insert(index, paragraph)
+        return paragraph['id']
+
+    def get_paragraph(self, body, note, paragraph):
+        """Return a paragraph with its current status."""
+        notebook = self.notebook(note)
+        self.update(notebook)
+        return self.view(self.paragraph(notebook, paragraph))
+
+    def update_paragraph(self, body, note, paragraph):
+        """Update the title and text of a paragraph."""
+        paragraph = self.paragraph(self.notebook(note), paragraph)
+        paragraph.update({key: body[key] for key in ('title', 'text') if key in body})
+
+    def delete_paragraph(self, body, note, paragraph):
+        """Delete a paragraph."""
+        notebook = self.notebook(note)
+        notebook['paragraphs'].remove(self.paragraph(notebook, paragraph))
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Handler answers requests from the state of its server."""
+
+    protocol_version = 'HTTP/1.1'  # keep connections alive like Zeppelin
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        """Keep the test output free of request logs."""
+        pass
+
+    def setup(self):
+        """Count the connection opened."""
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def handle_request(self, method):
+        """Answer a request with the route of the state matching method and path."""
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length).decode('utf-8')) if length else {}
+
+        status, result = 404, None
+        for route_method, pattern, name in ROUTES:
+            match = pattern.match(self.path)
+            if route_method == method and match:
+                with self.server.lock:
+                    self.server.requests[name] = self.server.requests.get(name, 0) + 1
+                if self.server.latency:
+                    time.sleep(self.server.latency)
+                with self.server.state.lock:
+                    try:
+                        status, result = 200, getattr(self.server.state, name)(
+                            body, **match.groupdict())
+                    except NotFound as err:
+                        status, result = 404, str(err)
+                if isinstance(result, tuple):
+                    status, result = result
+                break
+
+        data = json.dumps({'status': 'OK' if status == 200 else 'ERROR',
+                           'body': result}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        """Answer a GET request."""
+        self.handle_request('GET')
+
+    def do_POST(self):
+        """Answer a POST request."""
+        self.handle_request('POST')
+
+    def do_PUT(self):
+        """Answer a PUT request."""
+        self.handle_request('PUT')
+
+    def do_DELETE(self):
+        """Answer a DELETE request."""
+        self.handle_request('DELETE')
+
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    """ThreadingServer answers each connection in a thread of its own."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class MockZeppelin():
+    """MockZeppelin serves a stand-in for the Zeppelin REST API on a local port.
+
+    It implements the notebook, job and paragraph endpoints the executors
+    use, with simulated paragraph runs, so they can be tested and load
+    tested without a Zeppelin installation:
+
+        with MockZeppelin(duration=0.1) as zeppelin:
+            NotebookExecutor('note.json', '', zeppelin.url).execute_notebook(data)
+
+    Every request waits latency seconds before it is answered. The first
+    busy_responses status checks of each notebook are answered with HTTP
+    500, like a Zeppelin busy with other jobs. duration is the run time in
+    seconds of every paragraph, or a function returning it for a
+    paragraph, and paragraphs for which fail returns True end with ERROR.
+
+    The number of requests per route and of connections opened are kept in
+    requests and connections.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, duration=0.0, fail=None,
+                 busy_responses=0):
+        """Bind to host and port, 0 picking a free port."""
+        self.server = ThreadingServer((host, port), Handler)
+        self.server.state = ZeppelinState(duration, fail, busy_responses)
+        self.server.latency = latency
+        self.server.requests = {}
+        self.server.connections = 0
+        self.server.lock = threading.Lock()
+        self.url = '{0}:{1}'.format(host, self.server.server_address[1])
+        self.thread = None
+
+    @property
+    def state(self):
+        """Return the ZeppelinState holding the notebooks."""
+        return self.server.state
+
+    @property
+    def requests(self):
+        """Return the number of requests per route."""
+        return self.server.requests
+
+    @property
+    def connections(self):
+        """Return the number of connections opened."""
+        return self.server.connections
+
+    def add_notebook(self, data):
+        """Store a notebook as is, with its results, and return its id."""
+        with self.state.lock:
+            notebook_id = self.state.new_id('NOTE')
+            paragraphs = [dict(paragraph, id=paragraph.get('id') or self.state.new_id(
+                          'paragraph_')) for paragraph in data.get('paragraphs', [])]
+            self.state.notebooks[notebook_id] = {
+                'id': notebook_id, 'name': data.get('name', 'Untitled'),
+                'busy': self.state.busy_responses, 'paragraphs': paragraphs}
+        return notebook_id
+
+    def start(self):
+        """Serve requests in a background thread."""
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       kwargs={'poll_interval': 0.05}, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        if self.thread is not None:
+            self.server.shutdown()
+            self.thread = None
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    """Run a mock Zeppelin until interrupted."""
+    parser = argparse.ArgumentParser(description='Serve a mock Zeppelin REST API.')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (optional)')
+    parser.add_argument('--port', type=int, default=8890, help='Port to listen on (optional)')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Delay in seconds before every response (optional)')
+    parser.add_argument('--duration', type=float, default=0.0,
+                        help='Run time in seconds of every paragraph (optional)')
+    parser.add_argument('--busy-responses', dest='busy_responses', type=int, default=0,
+                        help='Number of 500 responses to the first status checks of each '
+                             'notebook (optional)')
+    args = parser.parse_args()
+
+    zeppelin = MockZeppelin(args.host, args.port, args.latency, args.duration,
+                            busy_responses=args.busy_responses)
+    print('Serving a mock Zeppelin on {0}'.format(zeppelin.url), file=sys.stderr)
+    try:
+        zeppelin.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        zeppelin.stop()
+
+
+if __name__ == '__main__':
+    main()